@@ -1,10 +1,9 @@
 import streamlit as st
-import pandas as pd
-import folium
-from folium.plugins import MarkerCluster, HeatMap
-from streamlit_folium import folium_static
-from folium import plugins
-import altair as alt
+from longsor_cluster.data import load_dataset, dataset_version, DATASET_JUMLAH, DATASET_SELECTION
+from longsor_cluster.panel import load_panel, value_and_delta, year_rows
+from longsor_cluster.maps import MarkerLayer, add_google_maps, apply_clicked_kabupaten, heat_points, selection_layer, show_interactive_map, sync_clicked_kabupaten
+from longsor_cluster.precompute import start_precompute
+from longsor_cluster.render_cache import cached_map, map_key
 
 
 # Set page configuration
@@ -25,104 +24,72 @@ st.title('ANALISIS PENGELOMPOKKAN DAERAH RAWAN BENCANA TANAH LONGSOR KABUPATEN/K
 st.divider()
 
 
-# Load your DataFrame from DATA_JABAR.csv
-file_path = 'UPDATE-Selection-Dataset_Longsor 2021 - 2023 - PROV JABAR.csv'
-df = pd.read_csv(file_path)
+# Load your DataFrame from the shared dataset cache, and its (KABUPATEN, TAHUN) panel
+# (per-year rows, year-over-year changes and totals, built once per dataset version)
+df = load_dataset(DATASET_SELECTION)
+panel = load_panel(DATASET_SELECTION)
+
+# Start clustering every option of the KMeans/AHC pages in the background
+start_precompute(DATASET_JUMLAH)
 
 # Sidebar for selecting the year
-selected_year = st.sidebar.slider('Select Year', min_value=df['TAHUN'].min(), max_value=df['TAHUN'].max(), value=df['TAHUN'].max(), step=1)
+selected_year = st.sidebar.slider('Select Year', min_value=panel['years'][0], max_value=panel['years'][-1], value=panel['years'][-1], step=1)
 
-# Dropdown for selecting the KABUPATEN
-selected_kabupaten = st.sidebar.selectbox('Select Kabupaten', df['KABUPATEN'].unique())
+# Dropdown for selecting the KABUPATEN (a marker clicked on the map also selects it)
+apply_clicked_kabupaten('selected_kabupaten')
+selected_kabupaten = st.sidebar.selectbox('Select Kabupaten', df['KABUPATEN'].unique(), key='selected_kabupaten')
 
 # Filter dataframe for the selected year and KABUPATEN
-df_filtered_year = df[df['TAHUN'] == selected_year]
+df_filtered_year = year_rows(panel, selected_year)
 df_filtered_kabupaten = df_filtered_year[df_filtered_year['KABUPATEN'] == selected_kabupaten]
 
-# Create a map with a unique key based on the selected year
-m = folium.Map(location=[df['LATITUDE'].mean(), df['LONGITUDE'].mean()], zoom_start=8, key=f"map-{selected_year}", width='100%')
-
-
-# Add a marker for each data point
-for i, row in df[df['TAHUN'] == selected_year].iterrows():
-    popup_content = f"""
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-    <div style='width:400px; height:300px;'>
-        <ul class="list-group">
-            <li class="list-group-item active" aria-current="true">
-                <h3 class="mb-0">Information of {row['KABUPATEN']}</h3>
-            </li>
-            <li class="list-group-item">
-                <b>Number of Landslides:</b> {row['JUMLAH_LONGSOR']}
-            </li>
-            <li class="list-group-item">
-                <b>Affected Population:</b> {row['JIWA_TERDAMPAK']}
-            </li>
-            <li class="list-group-item">
-                <b>Deaths:</b> {row['JIWA_MENINGGAL']}
-            </li>
-            <li class="list-group-item">
-                <b>Infrastructure Affected:</b> {row['RUSAK_TERDAMPAK']}
-            </li>
-            <li class="list-group-item">
-                <b>Minor Damage:</b> {row['RUSAK_RINGAN']}
-            </li>
-            <li class="list-group-item">
-                <b>Moderate Damage:</b> {row['RUSAK_SEDANG']}
-            </li>
-            <li class="list-group-item">
-                <b>Severe Damage:</b> {row['RUSAK_BERAT']}
-            </li>
-            <li class="list-group-item">
-                <b>Buried:</b> {row['TERTIMBUN']}
-            </li>
-            <li class="list-group-item">
-                <h4>Latitude: {row['LATITUDE']}</h4>
-            </li>
-            <li class="list-group-item">
-                <h4>Longitude: {row['LONGITUDE']}</h4>
-            </li>
-        </ul>
-    </div>
-    """
-
-    if row['KABUPATEN'] == selected_kabupaten:
-        icon = folium.Icon(color='red', icon='exclamation-triangle', prefix='fa')
-    else:
-        icon = folium.Icon(color='orange', icon='exclamation-triangle', prefix='fa')
-
-    folium.Marker(
-        location=[row['LATITUDE'], row['LONGITUDE']],
-        tooltip=row['KABUPATEN'],
-        icon=icon,
-    ).add_to(m).add_child(folium.Popup(popup_content, max_width=600))
-
-# Heatmap Layer
-heat_data = [[row['LATITUDE'], row['LONGITUDE']] for _, row in df[df['TAHUN'] == selected_year].iterrows()]
-HeatMap(heat_data).add_to(m)
-
-# Fullscreen Control
-plugins.Fullscreen(position='topright', title='Fullscreen', title_cancel='Exit Fullscreen').add_to(m)
-
-# Drawing Tools
-draw = plugins.Draw()
-draw.add_to(m)
-
-# Adding Google Maps tiles
-def add_google_maps(m):
-    tiles = "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}"
-    attr = "Google Digital Satellite"
-    folium.TileLayer(tiles=tiles, attr=attr, name=attr, overlay=True, control=True).add_to(m)
-    # Add labels for streets and objects
-    label_tiles = "https://mt1.google.com/vt/lyrs=h&x={x}&y={y}&z={z}"
-    label_attr = "Google Labels"
-    folium.TileLayer(tiles=label_tiles, attr=label_attr, name=label_attr, overlay=True, control=True).add_to(m)
-
+# Function to build the home page base map (markers, heatmap, controls and Google tiles).
+# The selected kabupaten is not part of it, it is drawn as a separate selection layer.
+def create_map(df_year, selected_year):
+    import folium
+    from folium import plugins
+    from folium.plugins import HeatMap
+
+    # Create a map with a unique key based on the selected year
+    m = folium.Map(location=[df['LATITUDE'].mean(), df['LONGITUDE'].mean()], zoom_start=8, key=f"map-{selected_year}", width='100%')
+
+    # Add a marker for each data point (one GeoJSON layer, popups rendered in the browser)
+    MarkerLayer(
+        df_year,
+        popup_title='Information of {KABUPATEN}',
+        popup_rows=[
+            ('Number of Landslides', 'JUMLAH_LONGSOR'),
+            ('Affected Population', 'JIWA_TERDAMPAK'),
+            ('Deaths', 'JIWA_MENINGGAL'),
+            ('Infrastructure Affected', 'RUSAK_TERDAMPAK'),
+            ('Minor Damage', 'RUSAK_RINGAN'),
+            ('Moderate Damage', 'RUSAK_SEDANG'),
+            ('Severe Damage', 'RUSAK_BERAT'),
+            ('Buried', 'TERTIMBUN'),
+            ('Latitude', 'LATITUDE'),
+            ('Longitude', 'LONGITUDE'),
+        ],
+    ).add_to(m)
+
+    # Heatmap Layer
+    HeatMap(heat_points(df_year)).add_to(m)
+
+    # Fullscreen Control
+    plugins.Fullscreen(position='topright', title='Fullscreen', title_cancel='Exit Fullscreen').add_to(m)
+
+    # Drawing Tools
+    draw = plugins.Draw()
+    draw.add_to(m)
+
+    m = add_google_maps(m)
+    m.add_child(folium.LayerControl(collapsed=False))
     return m
 
 
 # Function for creating a heatmap with color theme selection
 def make_heatmap(input_df, input_y, input_x, input_color, input_color_theme):
+    import altair as alt
+
     heatmap = alt.Chart(input_df).mark_rect().encode(
         y=alt.Y(f'{input_y}:O', axis=alt.Axis(title="TAHUN", titleFontSize=18, titlePadding=15, titleFontWeight=900, labelAngle=0)),
         x=alt.X(f'{input_x}:O', axis=alt.Axis(title="", titleFontSize=18, titlePadding=15, titleFontWeight=900)),
@@ -142,21 +109,19 @@ def make_heatmap(input_df, input_y, input_x, input_color, input_color_theme):
 def format_number(num):
     return "{:,}".format(num)
 
-# Fungsi perhitungan migrasi penduduk tahun ke tahun
-def calculate_population_difference(input_df, input_year):
-    selected_year_data = input_df[input_df['TAHUN'] == input_year].reset_index()
-    previous_year_data = input_df[input_df['TAHUN'] == input_year - 1].reset_index()
-    selected_year_data['population_difference'] = selected_year_data['JUMLAH_LONGSOR'].sub(previous_year_data['JUMLAH_LONGSOR'], fill_value=0)
-    return pd.concat([selected_year_data['KABUPATEN'], selected_year_data['TAHUN'], selected_year_data['JUMLAH_LONGSOR'], selected_year_data['population_difference']], axis=1).sort_values(by="population_difference", ascending=False)
+# Fungsi perhitungan perubahan jumlah longsor tahun ke tahun (dari panel, selaras per KABUPATEN)
+def calculate_population_difference(input_panel, input_year):
+    return input_panel['deltas'][input_year]
 
 a1, a2, a3 = st.columns(3)
 
 with a1:
-    df_population_difference_sorted = calculate_population_difference(df, selected_year)
+    df_population_difference_sorted = calculate_population_difference(panel, selected_year)
     if selected_year > 2020:
-        first_state_name = df_population_difference_sorted['KABUPATEN'].iloc[0]
-        first_state_population = format_number(int(df_population_difference_sorted['JUMLAH_LONGSOR'].iloc[0]))
-        first_state_delta = format_number(int(df_population_difference_sorted['population_difference'].iloc[0]))
+        first_state_name = df_population_difference_sorted.index[0]
+        first_state_value, first_state_change = value_and_delta(panel, first_state_name, selected_year)
+        first_state_population = format_number(int(first_state_value))
+        first_state_delta = format_number(int(first_state_change))
     else:
         first_state_name = '-'
         first_state_population = '-'
@@ -164,9 +129,10 @@ with a1:
     st.metric(label=first_state_name, value=first_state_population, delta=first_state_delta)
 with a2:
     if selected_year > 2020:
-        last_state_name = df_population_difference_sorted['KABUPATEN'].iloc[-1]
-        last_state_population = format_number(int(df_population_difference_sorted['JUMLAH_LONGSOR'].iloc[-1]))   
-        last_state_delta = format_number(int(df_population_difference_sorted['population_difference'].iloc[-1]))   
+        last_state_name = df_population_difference_sorted.index[-1]
+        last_state_value, last_state_change = value_and_delta(panel, last_state_name, selected_year)
+        last_state_population = format_number(int(last_state_value))
+        last_state_delta = format_number(int(last_state_change))
     else:
         last_state_name = '-'
         last_state_population = '-'
@@ -174,9 +140,8 @@ with a2:
     st.metric(label=last_state_name, value=last_state_population, delta=last_state_delta)
 with a3:
     if selected_year > 2020:
-        total_landslides_selected_year = df[df['TAHUN'] == selected_year]['JUMLAH_LONGSOR'].sum()
-        total_landslides_last_year = df[df['TAHUN'] == selected_year - 1]['JUMLAH_LONGSOR'].sum()
-        landslide_difference = total_landslides_selected_year - total_landslides_last_year
+        total_landslides_selected_year = int(panel['totals'].at[selected_year, 'JUMLAH_LONGSOR'])
+        landslide_difference = int(panel['total_deltas'].at[selected_year, 'JUMLAH_LONGSOR'])
 
         total_landslides_name = "Total Landslides"
         total_landslides_value = format_number(total_landslides_selected_year)
@@ -191,14 +156,21 @@ with a3:
 col1, col2 = st.columns((5, 2), gap='medium')
 
 with col1:
-        m = add_google_maps(m)
-        m.add_child(folium.LayerControl(collapsed=False))
-        folium_static(m, width=850, height=520)
+        # Base map is cached per (dataset version, year, layers); changing the kabupaten only
+        # swaps the selection layer, so the map keeps its zoom and pan
+        base_map = cached_map(
+            map_key(dataset_version(DATASET_SELECTION), year=selected_year,
+                    layers=('markers', 'heatmap', 'fullscreen', 'draw', 'google')),
+            lambda: create_map(df_filtered_year, selected_year),
+        )
+        clicked_kabupaten = show_interactive_map(base_map, selection_layer(df_filtered_year, selected_kabupaten),
+                                                 key='home_map', width=850, height=520)
+        sync_clicked_kabupaten(clicked_kabupaten, selected_kabupaten, 'selected_kabupaten')
 
 
 with col2:
-    # Filter the dataframe based on the selected year
-    df_filtered = df[df['TAHUN'] == selected_year]
+    # Rows of the selected year (panel partition)
+    df_filtered = df_filtered_year
     
     # Sort the filtered dataframe by the number of landslides
     df_landslide_sorted = df_filtered.sort_values(by="JUMLAH_LONGSOR", ascending=False)
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import folium
+import plotly.express as px
+from folium.plugins import HeatMap
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.synthetic import generate, parse_size
+from longsor_cluster import data as longsor_data
+from longsor_cluster.ahc import cluster_tree
+from longsor_cluster.charts import line_chart, scatter_chart
+from longsor_cluster.data import CLUSTER_FEATURES, load_dataset
+from longsor_cluster.kmeans import N_INIT, kmeans_path
+from longsor_cluster.maps import CLUSTER_POPUP_ROWS, MarkerLayer, heat_points
+from longsor_cluster.quality import silhouette_estimate
+from longsor_cluster.render_cache import render_html
+from longsor_cluster.risk import categorize_clusters
+
+# Ukuran dataset sintetis yang diuji secara default
+DEFAULT_SIZES = ['1k', '10k', '100k', '1M']
+
+# Tahap peta folium menghasilkan HTML O(n); dilewati di atas batas baris ini
+MAP_MAX_ROWS = int(os.environ.get('LONGSOR_BENCH_MAP_MAX_ROWS', 100_000))
+
+# Selisih relatif yang masih dianggap normal saat dibandingkan dengan baseline
+DEFAULT_TOLERANCE = 0.25
+
+
+# Function to time one call and track its peak Python allocation
+def measure(function, repeat=1):
+    seconds = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {'seconds': min(seconds), 'peak_mb': peak / 2**20}
+
+
+# Stage: parse the CSV and write the Feather copy (cold), then read the copy again (warm)
+def _bench_csv_load(csv_path, cache_dir):
+    def cold():
+        longsor_data._frames.clear()
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+        load_dataset(csv_path)
+
+    def warm():
+        longsor_data._frames.clear()
+        load_dataset(csv_path)
+
+    return {'csv_load_cold': measure(cold), 'csv_load_warm': measure(warm)}
+
+
+# Stage: one KMeans fit per k (elbow sweep), without the silhouette which is timed separately:
+# independent fits (N_INIT k-means++ restarts per k), then the warm-started path with its speedup
+# and its parity with the independent fits: the worst inertia ratio and the lowest ARI over k
+def _bench_kmeans(X):
+    models = {}
+    independent = measure(lambda: models.update(independent=kmeans_path(X, range(1, 11), mode='independent')))
+    warm = measure(lambda: models.update(warm=kmeans_path(X, range(1, 11), mode='warm')))
+    warm['speedup'] = independent['seconds'] / warm['seconds']
+    pairs = [(models['warm'][k], models['independent'][k]) for k in range(1, 11)]
+    warm['max_inertia_ratio'] = max(w.inertia_ / i.inertia_ for w, i in pairs)
+    warm['min_ari'] = min(adjusted_rand_score(i.labels_, w.labels_) for w, i in pairs)
+    return {'kmeans_sweep': independent, 'kmeans_sweep_warm': warm}
+
+
+# Stage: risk categorisation of every row by the mean JUMLAH_LONGSOR of its cluster
+def _bench_risk(frame):
+    return measure(lambda: categorize_clusters(frame))
+
+
+# Stage: marker + heatmap map build and render to HTML, as on the KMeans map page
+def _bench_map(frame):
+    def build():
+        m = folium.Map(location=[frame['LATITUDE'].mean(), frame['LONGITUDE'].mean()], zoom_start=10)
+        MarkerLayer(frame, 'Cluster Information', CLUSTER_POPUP_ROWS, icon='home', color='red').add_to(m)
+        HeatMap(heat_points(frame)).add_to(m)
+        render_html(m)
+
+    return measure(build)
+
+
+# Stage: Plotly figure specs for the scatter and line charts of the dashboards, every row as
+# before and through the chart data layer (LTTB / grid aggregation / WebGL), with payload sizes
+def _bench_charts(frame):
+    payload = {}
+
+    def build(frame):
+        payload['raw'] = len(px.scatter(frame, x='LONGITUDE', y='LATITUDE', color='cluster').to_json())
+        payload['raw'] += len(px.line(frame, x=frame.index, y='JUMLAH_LONGSOR').to_json())
+
+    def build_reduced(frame):
+        # A fresh version per call, so every measurement pays for the aggregation
+        version = str(time.perf_counter())
+        payload['reduced'] = len(scatter_chart(frame, 'LONGITUDE', 'LATITUDE', version, color='cluster').to_json())
+        payload['reduced'] += len(line_chart(frame, 'JUMLAH_LONGSOR', version).to_json())
+
+    # Warm up plotly (templates, validators) so the first size is not charged for it
+    build(frame.head(10))
+    build_reduced(frame.head(10))
+    raw = measure(lambda: build(frame))
+    reduced = measure(lambda: build_reduced(frame))
+    raw['payload_kb'] = payload['raw'] / 1024
+    reduced['payload_kb'] = payload['reduced'] / 1024
+    return {'chart_specs': raw, 'chart_specs_reduced': reduced}
+
+
+# Function to run every stage for one dataset size
+def run_size(n_rows, seed=42):
+    stages = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, f'synthetic_{n_rows}.csv')
+        generate(n_rows, seed).to_csv(csv_path, index=False)
+
+        cache_dir = os.path.join(tmp, 'cache')
+        os.makedirs(cache_dir)
+        previous_cache_dir = longsor_data.CACHE_DIR
+        longsor_data.CACHE_DIR = cache_dir
+        try:
+            stages.update(_bench_csv_load(csv_path, cache_dir))
+            frame = load_dataset(csv_path).copy()
+        finally:
+            longsor_data.CACHE_DIR = previous_cache_dir
+            longsor_data._frames.pop(os.path.abspath(csv_path), None)
+
+    X = frame[CLUSTER_FEATURES].to_numpy(dtype=float)
+    frame['cluster'] = KMeans(n_clusters=3, n_init=N_INIT, random_state=42).fit_predict(X)
+
+    stages.update(_bench_kmeans(X))
+    # Exact linkage up to MAX_EXACT_ROWS, BIRCH micro-clusters + linkage above it
+    stages['ahc_linkage'] = measure(lambda: cluster_tree(X, 'average'))
+    # Exact within the latency budget, sampled (with bootstrap interval) above it
+    stages['silhouette'] = measure(lambda: silhouette_estimate(X, frame['cluster'].to_numpy()))
+    stages['risk_categorisation'] = _bench_risk(frame)
+    if n_rows <= MAP_MAX_ROWS:
+        stages['map_build'] = _bench_map(frame)
+    else:
+        stages['map_build'] = {'skipped': f'n > {MAP_MAX_ROWS} (map HTML)'}
+    stages.update(_bench_charts(frame))
+    return stages
+
+
+# Function to compare a run with a baseline; returns the stages slower than the tolerance allows
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for size, stages in results['sizes'].items():
+        for stage, result in stages.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(stage, {})
+            if 'seconds' not in result or 'seconds' not in before:
+                continue
+            ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+            result['baseline_seconds'] = before['seconds']
+            result['ratio'] = ratio
+            if ratio > 1 + tolerance:
+                regressions.append((size, stage, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description='Benchmark each dashboard stage on synthetic Longsor data')
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[parse_size(size) for size in DEFAULT_SIZES])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmarks/results.json', help='JSON file for the results')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown, e.g. 0.25 for 25%%')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 when a stage regressed')
+    args = parser.parse_args(argv)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sizes': {},
+    }
+    for n_rows in args.sizes:
+        print(f'Benchmarking {n_rows} rows ...', flush=True)
+        results['sizes'][str(n_rows)] = run_size(n_rows, args.seed)
+        for stage, result in results['sizes'][str(n_rows)].items():
+            if 'seconds' in result:
+                payload = f"  {result['payload_kb']:.0f} KB sent" if 'payload_kb' in result else ''
+                speedup = f"  {result['speedup']:.1f}x faster" if 'speedup' in result else ''
+                parity = (f"  inertia <= {result['max_inertia_ratio']:.2f}x, ARI >= {result['min_ari']:.2f}"
+                          if 'max_inertia_ratio' in result else '')
+                print(f"  {stage:<22} {result['seconds']:>9.3f} s  {result['peak_mb']:>9.1f} MB{payload}{speedup}{parity}")
+            else:
+                print(f"  {stage:<22} skipped: {result['skipped']}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, stage, ratio in regressions:
+            print(f'REGRESSION {stage} at {size} rows: {ratio:.2f}x baseline')
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.data import COUNT_COLUMNS, DATASET_SELECTION, load_dataset
+
+# Sebaran lokasi desa di sekitar titik kabupaten/kota (derajat)
+LOCATION_SPREAD = 0.15
+
+
+# Function to parse sizes such as "1k", "10k", "1M"
+def parse_size(text):
+    match = re.fullmatch(r'(\d+)([kKmM]?)', text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f'invalid size: {text}')
+    number, unit = match.groups()
+    return int(number) * {'': 1, 'k': 1_000, 'm': 1_000_000}[unit.lower()]
+
+
+# Function to generate a synthetic Longsor table with the schema of the per-year dataset.
+# Each row is a village-level record: it picks a kabupaten/kota and a year from the real data,
+# draws counts from a Poisson around that kabupaten's per-village rate and jitters its location.
+def generate(n_rows, seed=42, villages_per_kabupaten=200):
+    rng = np.random.default_rng(seed)
+    base = load_dataset(DATASET_SELECTION)
+    base = base[['KABUPATEN', 'TAHUN'] + COUNT_COLUMNS + ['LATITUDE', 'LONGITUDE']].dropna(subset=['KABUPATEN'])
+
+    picks = rng.integers(0, len(base), size=n_rows)
+    rows = base.iloc[picks].reset_index(drop=True)
+
+    synthetic = pd.DataFrame({
+        'No': np.arange(1, n_rows + 1),
+        'KABUPATEN': rows['KABUPATEN'].to_numpy(),
+        'TAHUN': rows['TAHUN'].to_numpy(),
+    })
+    for column in COUNT_COLUMNS:
+        rate = rows[column].to_numpy(dtype=float) / villages_per_kabupaten
+        synthetic[column] = rng.poisson(rate * rng.gamma(2.0, 0.5, size=n_rows))
+    synthetic['LATITUDE'] = rows['LATITUDE'].to_numpy(dtype=float) + rng.normal(0, LOCATION_SPREAD, size=n_rows)
+    synthetic['LONGITUDE'] = rows['LONGITUDE'].to_numpy(dtype=float) + rng.normal(0, LOCATION_SPREAD, size=n_rows)
+    return synthetic
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.synthetic', description='Generate a synthetic Longsor dataset')
+    parser.add_argument('size', type=parse_size, help='number of rows, e.g. 1k, 10k, 100k, 1M')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    generate(args.size, args.seed).to_csv(args.output, index=False)
+    print(f'{args.size} rows written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Modul bersama untuk dashboard klasterisasi daerah rawan bencana tanah longsor Jawa Barat
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import time
+
+from longsor_cluster.ahc import LINKAGE_METHODS
+from longsor_cluster.data import CLUSTER_FEATURES, DATASET_JUMLAH, DATASET_SELECTION, dataset_version, schema_report
+from longsor_cluster.pipeline import ARTIFACT_DIR, parse_range, run_pipeline, run_silhouette_audit
+from longsor_cluster.precompute import warm_store
+from longsor_cluster.startup import PAGE_TIMEOUT, profile_startup
+from longsor_cluster.store import STORE_DIR, prune
+from longsor_cluster.streaming import CHUNK_ROWS, run_stream
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m longsor_cluster', description='Headless clustering jobs for the Longsor dashboard')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the KMeans/AHC sweeps and write the artifacts used by the pages')
+    run.add_argument('--algo', choices=['kmeans', 'ahc', 'all'], default='all')
+    run.add_argument('--k', type=parse_range, default=range(1, 11), help='number of clusters, e.g. 2..10')
+    run.add_argument('--methods', nargs='+', choices=LINKAGE_METHODS, default=LINKAGE_METHODS)
+    run.add_argument('--dataset', default=DATASET_JUMLAH)
+    run.add_argument('--out', default=ARTIFACT_DIR)
+
+    audit = commands.add_parser('silhouette', help='exact silhouette of every k in one blocked pass (bounded memory)')
+    audit.add_argument('--algo', choices=['kmeans', 'ahc', 'all'], default='all')
+    audit.add_argument('--k', type=parse_range, default=range(2, 11), help='number of clusters, e.g. 2..10')
+    audit.add_argument('--methods', nargs='+', choices=LINKAGE_METHODS, default=LINKAGE_METHODS)
+    audit.add_argument('--dataset', default=DATASET_JUMLAH)
+    audit.add_argument('--out', default=ARTIFACT_DIR)
+
+    schema = commands.add_parser('schema', help='show the memory saved by the compact schema of each dataset')
+    schema.add_argument('datasets', nargs='*', default=[DATASET_JUMLAH, DATASET_SELECTION])
+
+    stream = commands.add_parser('stream', help='cluster an event-level CSV in chunks with MiniBatchKMeans')
+    stream.add_argument('dataset', help='event CSV with the clustering feature columns')
+    stream.add_argument('--k', type=int, default=3)
+    stream.add_argument('--features', nargs='+', default=CLUSTER_FEATURES)
+    stream.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help='rows read per chunk')
+    stream.add_argument('--epochs', type=int, default=1, help='passes over the file for partial_fit')
+    stream.add_argument('--out', default=os.path.join(ARTIFACT_DIR, 'stream'))
+
+    warm = commands.add_parser('warm', help='fit every page model once and persist it in the model store')
+    warm.add_argument('--dataset', default=DATASET_JUMLAH)
+
+    store = commands.add_parser('prune', help='drop stale dataset versions from the model store and cap its size')
+    store.add_argument('datasets', nargs='*', default=[DATASET_JUMLAH, DATASET_SELECTION])
+    store.add_argument('--max-mb', type=float, default=None, help='remove the least recently written configurations above this size')
+    store.add_argument('--store', default=STORE_DIR)
+
+    startup = commands.add_parser('profile-startup', help='time the cold start and first run of every page in a fresh process')
+    startup.add_argument('pages', nargs='*', help='page files (default: the home page and pages/*.py)')
+    startup.add_argument('--timeout', type=float, default=PAGE_TIMEOUT, help='seconds allowed for one page run')
+    startup.add_argument('--output', help='JSON file for the report, to compare cold starts between deploys')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        algorithms = ['kmeans', 'ahc'] if args.algo == 'all' else [args.algo]
+        out = run_pipeline(args.dataset, algorithms, args.k, args.methods, args.out)
+        print(f'Artifacts written to {out}')
+    elif args.command == 'silhouette':
+        algorithms = ['kmeans', 'ahc'] if args.algo == 'all' else [args.algo]
+        path = run_silhouette_audit(args.dataset, algorithms, args.k, args.methods, args.out)
+        print(f'Exact silhouette scores written to {path}')
+    elif args.command == 'schema':
+        for dataset in args.datasets:
+            report = schema_report(dataset)
+            print(f"{dataset}: {report['bytes_before']:,} -> {report['bytes_after']:,} bytes "
+                  f"({report['saved_ratio']:.0%} saved), dropped {len(report['dropped_columns'])} empty columns")
+    elif args.command == 'stream':
+        labels_path, centroids_path, summary = run_stream(args.dataset, args.k, args.out, args.features, args.chunksize, args.epochs)
+        print(f"{summary['rows']} rows clustered into {summary['num_clusters']} clusters (inertia {summary['inertia']:.1f})")
+        print(f'Labels written to {labels_path}, centroids to {centroids_path}')
+    elif args.command == 'warm':
+        fits = warm_store(args.dataset)
+        print(f'{fits} fits run, model store warm for {args.dataset}')
+    elif args.command == 'prune':
+        versions = {dataset: dataset_version(dataset) for dataset in args.datasets if os.path.exists(dataset)}
+        removed = prune(versions, args.max_mb, args.store)
+        print(f'{len(removed)} model store folders removed from {args.store}')
+    elif args.command == 'profile-startup':
+        report = profile_startup(args.pages, timeout=args.timeout)
+        for page in report:
+            if 'error' in page:
+                print(f"{page['page']}: failed ({page['error']})")
+                continue
+            print(f"{page['page']}: cold start {page['cold_start_s']:.2f} s (first run {page['first_run_s']:.2f} s, "
+                  f"rerun {page['rerun_s']:.2f} s), heavy modules: {', '.join(page['modules']) or 'none'}")
+            print('    slowest imports: ' + ', '.join(f'{name} {ms:.0f} ms' for name, ms in page['imports_ms'].items()))
+            for error in page['exceptions']:
+                print(f'    exception: {error}')
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'pages': report}, f, indent=2)
+            print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.distance import condensed_distances, fingerprint
+from longsor_cluster.quality import silhouette_estimate
+
+# Metode linkage yang ditampilkan di dashboard AHC
+LINKAGE_METHODS = ['single', 'complete', 'average']
+
+# Jumlah maksimum pohon linkage yang disimpan di memori
+MAX_TREES = 32
+
+# Di atas jumlah baris ini AHC dijalankan pada micro-cluster BIRCH (CF-tree), bukan pada setiap baris
+MAX_EXACT_ROWS = int(os.environ.get('LONGSOR_AHC_MAX_ROWS', 5000))
+
+# Jumlah maksimum micro-cluster (daun dendrogram) untuk mode data besar
+MAX_MICRO_CLUSTERS = int(os.environ.get('LONGSOR_AHC_MICRO_CLUSTERS', 2000))
+
+# Cache per proses: satu pohon linkage per (fitur, metode), dipakai bersama oleh
+# sweep silhouette, dendrogram dan peta klaster, dan micro-cluster BIRCH per fitur
+_trees = OrderedDict()
+_micro = OrderedDict()
+_lock = threading.Lock()
+
+
+# Function to build (or reuse) the linkage tree of a feature matrix for one method,
+# starting from the shared condensed distance matrix
+def linkage_tree(features, method, metric='euclidean'):
+    from scipy.cluster.hierarchy import linkage
+
+    X = np.ascontiguousarray(features, dtype=float)
+    key = (fingerprint(X), method, metric)
+
+    with _lock:
+        Z = _trees.get(key)
+        if Z is not None:
+            _trees.move_to_end(key)
+            return Z
+
+    Z = linkage(condensed_distances(X, metric), method=method)
+    with _lock:
+        _trees[key] = Z
+        while len(_trees) > MAX_TREES:
+            _trees.popitem(last=False)
+    return Z
+
+
+# Function to fit a BIRCH CF-tree with the given threshold; returns the row -> subcluster index
+def _birch_assignment(X, threshold):
+    from sklearn.cluster import Birch
+
+    birch = Birch(threshold=threshold, n_clusters=None).fit(X)
+    return birch.labels_, len(birch.subcluster_centers_)
+
+
+# Function to compress a feature matrix into at most max_micro micro-clusters with a CF-tree.
+# The threshold is tuned on a sample and then raised until the full data fits the budget.
+# Returns the micro-cluster centroids, their sizes and the micro-cluster index of every row.
+def micro_clusters(features, max_micro=MAX_MICRO_CLUSTERS, random_state=42):
+    X = np.ascontiguousarray(features, dtype=float)
+    key = (fingerprint(X), max_micro)
+    with _lock:
+        micro = _micro.get(key)
+        if micro is not None:
+            _micro.move_to_end(key)
+            return micro
+
+    rng = np.random.default_rng(random_state)
+    sample = X[rng.choice(len(X), size=min(len(X), 5 * max_micro), replace=False)]
+    threshold = max(0.05 * float(np.linalg.norm(X.std(axis=0))), 1e-9)
+    while _birch_assignment(sample, threshold)[1] > max_micro // 4:
+        threshold *= 2
+    assignment, count = _birch_assignment(X, threshold)
+    while count > max_micro:
+        threshold *= 2
+        assignment, count = _birch_assignment(X, threshold)
+
+    # Drop subclusters that received no rows and use the exact means of the final assignment
+    _, assignment = np.unique(assignment, return_inverse=True)
+    weights = np.bincount(assignment)
+    centroids = np.column_stack([np.bincount(assignment, weights=X[:, j]) for j in range(X.shape[1])]) / weights[:, None]
+    micro = {'centroids': centroids, 'weights': weights, 'assignment': assignment, 'threshold': threshold}
+
+    with _lock:
+        _micro[key] = micro
+        while len(_micro) > MAX_TREES:
+            _micro.popitem(last=False)
+    return micro
+
+
+# Function to get the tree used for AHC on a feature matrix of any size.
+# Up to MAX_EXACT_ROWS rows every row is a leaf; above it the leaves are BIRCH micro-clusters
+# (centroids, unweighted) and `leaves` maps every row to its leaf. Returns (Z, leaves).
+def cluster_tree(features, method, metric='euclidean'):
+    X = np.ascontiguousarray(features, dtype=float)
+    if len(X) <= MAX_EXACT_ROWS:
+        return linkage_tree(X, method, metric), np.arange(len(X))
+    micro = micro_clusters(X)
+    return linkage_tree(micro['centroids'], method, metric), micro['assignment']
+
+
+# Function to get the points at the leaves of cluster_tree (the rows, or the micro-cluster centroids)
+def tree_leaves(features):
+    X = np.ascontiguousarray(features, dtype=float)
+    if len(X) <= MAX_EXACT_ROWS:
+        return X
+    return micro_clusters(X)['centroids']
+
+
+# Function to get the cophenetic correlation of a method, at the leaves of cluster_tree
+def cophenetic_correlation(features, method, metric='euclidean'):
+    from scipy.cluster.hierarchy import cophenet
+
+    Z, _ = cluster_tree(features, method, metric)
+    ccc, _ = cophenet(Z, condensed_distances(tree_leaves(features), metric))
+    return ccc
+
+
+# Function to cut a tree into (at most) k clusters, labels start at 0 like AgglomerativeClustering
+def cut_k(Z, k):
+    from scipy.cluster.hierarchy import fcluster
+
+    return fcluster(Z, t=k, criterion='maxclust') - 1
+
+
+# Function to cut a tree at a distance threshold, labels start at 0
+def cut_distance(Z, threshold):
+    from scipy.cluster.hierarchy import fcluster
+
+    return fcluster(Z, t=threshold, criterion='distance') - 1
+
+
+# Function to sweep every (method, k) by cutting one tree per method.
+# Returns the row labels by (method, k) and a table with the silhouette estimate of every cut
+# (scored on the tree leaves, i.e. on the micro-clusters for large data).
+def ahc_sweep(features, methods=LINKAGE_METHODS, k_values=range(2, 11)):
+    X = np.ascontiguousarray(features, dtype=float)
+    points = tree_leaves(X)
+
+    labels = {}
+    rows = []
+    for method in methods:
+        Z, leaves = cluster_tree(X, method)
+        for k in k_values:
+            cut = cut_k(Z, k)
+            labels[(method, k)] = cut[leaves]
+            rows.append({'method': method, 'num_clusters': k, **silhouette_estimate(points, cut)})
+
+    return labels, pd.DataFrame(rows)
@@ -0,0 +1,124 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.lazy import memoized
+
+# Batas ukuran data satu grafik yang dikirim ke browser (KB); di atasnya garis di-downsample
+# (LTTB) dan scatter koordinat diagregasi ke grid
+CHART_PAYLOAD_KB = float(os.environ.get('LONGSOR_CHART_PAYLOAD_KB', 512))
+
+# Perkiraan ukuran JSON satu nilai numerik pada spesifikasi Plotly (byte)
+VALUE_BYTES = 24
+
+# Di atas jumlah titik ini trace digambar dengan WebGL, bukan SVG
+WEBGL_MIN_POINTS = int(os.environ.get('LONGSOR_WEBGL_POINTS', 1000))
+
+# Jumlah sel grid maksimum per sumbu untuk scatter yang diagregasi
+MAX_GRID_BINS = 200
+
+
+# Function to get the number of points of a chart that fit the payload budget
+def max_points(columns):
+    return max(3, int(CHART_PAYLOAD_KB * 1024 // (VALUE_BYTES * columns)))
+
+
+# Function to decide how a chart of `rows` rows is sent to the browser.
+# Returns (plan, points, render_mode): plan is 'raw' when every row fits the payload budget,
+# otherwise 'lttb' (lines) or 'grid' (scatter); render_mode is 'webgl' above WEBGL_MIN_POINTS.
+def chart_plan(rows, columns, kind='line'):
+    budget = max_points(columns)
+    if rows <= budget:
+        plan, points = 'raw', rows
+    else:
+        plan, points = ('lttb' if kind == 'line' else 'grid'), budget
+    return plan, points, 'webgl' if points > WEBGL_MIN_POINTS else 'svg'
+
+
+# Function to downsample a line with largest-triangle-three-buckets.
+# Keeps the first and last point and, per bucket, the point forming the largest triangle with
+# the previously kept point and the mean of the next bucket. Returns the kept row positions.
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * every).astype(int) + 1
+    edges[-1] = n - 1
+    # Mean of every bucket (the last "bucket" is the last point), computed once up front
+    sizes = np.diff(np.append(edges, n))
+    mean_x = np.add.reduceat(x, edges) / sizes
+    mean_y = np.add.reduceat(y, edges) / sizes
+
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - mean_x[i + 1]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i + 1] - ay))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+# Function to aggregate a scatter into a bins x bins grid: per non-empty cell the mean
+# coordinates, the number of rows and (with color) the most frequent color value
+def grid_bins(df, x, y, color=None, bins=MAX_GRID_BINS):
+    frame = df[[x, y] + ([color] if color else [])].dropna(subset=[x, y])
+    cells = np.zeros(len(frame), dtype=np.int64)
+    for column in (x, y):
+        values = frame[column].to_numpy(dtype=float)
+        low, high = values.min(), values.max()
+        index = np.floor((values - low) / (high - low) * bins) if high > low else np.zeros(len(values))
+        cells = cells * bins + np.clip(index, 0, bins - 1).astype(np.int64)
+
+    grouped = frame.assign(_cell=cells).groupby('_cell', sort=True)
+    binned = grouped[[x, y]].mean()
+    binned['count'] = grouped.size()
+    if color:
+        counts = frame.groupby([cells, frame[color]], sort=False).size()
+        dominant = counts.sort_values(ascending=False, kind='stable').reset_index(level=1).groupby(level=0).first()
+        binned[color] = dominant[color]
+    return binned.reset_index(drop=True)
+
+
+# Function to hash the values of a column, so an aggregate is reused for as long as they are the same
+def _values_hash(values):
+    hashed = pd.util.hash_pandas_object(pd.Series(np.asarray(values)), index=False).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+# Function to build a line chart of one column against the row index, downsampled with LTTB
+# when it does not fit the payload budget (the kept rows are cached per dataset version)
+def line_chart(df, y, version, **kwargs):
+    import plotly.express as px
+
+    plan, points, render_mode = chart_plan(len(df), 2, 'line')
+    if plan == 'lttb':
+        keep = memoized((version, 'lttb', y, points), lambda: lttb(np.arange(len(df)), df[y], points))
+        df = df.iloc[keep]
+    return px.line(df, x=df.index, y=y, render_mode=render_mode, **kwargs)
+
+
+# Function to build a coordinate scatter, aggregated to a grid (marker size = rows per cell,
+# color = most frequent value) when it does not fit the payload budget; the grid is cached per
+# dataset version and color values
+def scatter_chart(df, x, y, version, color=None, hover_data=None, **kwargs):
+    import plotly.express as px
+
+    columns = 2 + (color is not None) + len(hover_data or [])
+    plan, points, render_mode = chart_plan(len(df), columns, 'scatter')
+    if plan == 'raw':
+        return px.scatter(df, x=x, y=y, color=color, hover_data=hover_data, render_mode=render_mode, **kwargs)
+
+    bins = min(MAX_GRID_BINS, int(np.sqrt(points)))
+    key = (version, 'grid', x, y, color, _values_hash(df[color]) if color else None, bins)
+    binned = memoized(key, lambda: grid_bins(df, x, y, color, bins))
+    _, _, render_mode = chart_plan(len(binned), columns, 'scatter')
+    return px.scatter(binned, x=x, y=y, color=color, size='count', hover_data=['count'], render_mode=render_mode, **kwargs)
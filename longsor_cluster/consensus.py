@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.ahc import MAX_EXACT_ROWS, cut_k, micro_clusters
+from longsor_cluster.risk import risk_category
+
+# Jumlah clustering (seed berbeda, sampel berbeda) per analisis konsensus dan fraksi baris per sampel
+CONSENSUS_RUNS = int(os.environ.get('LONGSOR_CONSENSUS_RUNS', 50))
+CONSENSUS_SUBSAMPLE = float(os.environ.get('LONGSOR_CONSENSUS_SUBSAMPLE', 0.8))
+
+# Jumlah proses worker; di bawah jumlah titik ini semua run dijalankan di proses sendiri
+# (biaya start proses lebih besar dari fit-nya)
+CONSENSUS_WORKERS = int(os.environ.get('LONGSOR_CONSENSUS_WORKERS', os.cpu_count() or 1))
+PROCESS_MIN_POINTS = int(os.environ.get('LONGSOR_CONSENSUS_PROCESS_POINTS', 1000))
+
+# Pool proses worker per jumlah worker, dibuat sekali per proses dan dipakai ulang oleh setiap
+# analisis konsensus (worker tidak perlu start dan import sklearn lagi)
+_executors = {}
+_lock = threading.Lock()
+
+
+# Function to get the shared process pool with the given number of workers
+def _pool(workers):
+    with _lock:
+        if workers not in _executors:
+            context = multiprocessing.get_context('spawn')
+            _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return _executors[workers]
+
+
+# Function to run one batch of clusterings on seeded subsamples of the points.
+# Returns (sample index, labels) per seed; the seed fixes both the sample and the fit.
+# The AHC trees of the subsamples are built here and not in the shared tree and distance caches
+# of the pages, which they would fill up.
+def _run_batch(points, weights, algorithm, method, k, seeds, subsample):
+    from scipy.cluster.hierarchy import linkage
+    from sklearn.cluster import KMeans
+
+    n = len(points)
+    size = min(n, max(k + 1, int(round(subsample * n))))
+    runs = []
+    for seed in seeds:
+        sample = np.sort(np.random.default_rng(seed).choice(n, size=size, replace=False))
+        if algorithm == 'kmeans':
+            model = KMeans(n_clusters=k, n_init=1, random_state=seed).fit(points[sample], sample_weight=weights[sample])
+            labels = model.labels_
+        else:
+            labels = cut_k(linkage(points[sample], method=method), k)
+        runs.append((sample, labels.astype(np.int16)))
+    return runs
+
+
+# Function to run every clustering, in a process pool when the data is large enough, and yield
+# the runs as they finish
+def _runs(points, weights, algorithm, method, k, seeds, subsample, workers):
+    if workers <= 1 or len(points) < PROCESS_MIN_POINTS:
+        yield from _run_batch(points, weights, algorithm, method, k, seeds, subsample)
+        return
+
+    batches = np.array_split(seeds, min(len(seeds), 2 * workers))
+    pool = _pool(workers)
+    futures = [pool.submit(_run_batch, points, weights, algorithm, method, k, batch.tolist(), subsample) for batch in batches]
+    for future in as_completed(futures):
+        yield from future.result()
+
+
+# Function to run a consensus analysis: many seeded clusterings on random subsamples, a
+# co-association matrix (how often two points share a cluster when sampled together) built
+# incrementally as runs finish, and a consensus partition cut from its average-linkage tree.
+# Above MAX_EXACT_ROWS rows the points are the BIRCH micro-clusters of the AHC mode.
+# counts (e.g. JUMLAH_LONGSOR) adds the risk category stability of the KMeans page.
+# Returns per row: consensus labels and stability (mean co-association with the other members
+# of its consensus cluster); per cluster: size and stability.
+def consensus_clustering(features, k, algorithm='kmeans', method='average', counts=None, runs=CONSENSUS_RUNS,
+                         subsample=CONSENSUS_SUBSAMPLE, random_state=42, workers=CONSENSUS_WORKERS):
+    from scipy.cluster.hierarchy import linkage
+    from scipy.spatial.distance import squareform
+
+    X = np.ascontiguousarray(features, dtype=float)
+    if len(X) <= MAX_EXACT_ROWS:
+        points, weights, leaves = X, np.ones(len(X)), np.arange(len(X))
+    else:
+        micro = micro_clusters(X)
+        points, weights, leaves = micro['centroids'], micro['weights'].astype(float), micro['assignment']
+    n = len(points)
+
+    # Co-association counts as uint16 (runs <= 65535): pairs clustered together / sampled together
+    same = np.zeros((n, n), dtype=np.uint16)
+    together = np.zeros((n, n), dtype=np.uint16)
+    run_labels = []
+    seeds = [random_state + run for run in range(runs)]
+    for sample, labels in _runs(points, weights, algorithm, method, k, seeds, subsample, workers):
+        index = np.ix_(sample, sample)
+        together[index] += np.uint16(1)
+        same[index] += (labels[:, None] == labels[None, :]).astype(np.uint16)
+        run_labels.append((sample, labels))
+
+    coassociation = np.divide(same, together, out=np.zeros((n, n), dtype=np.float32), where=together > 0, dtype=np.float32)
+    np.fill_diagonal(coassociation, 1.0)
+    Z = linkage(squareform(1.0 - coassociation, checks=False), method='average')
+    consensus = cut_k(Z, k)
+
+    # Item consensus: mean co-association with the other members of the consensus cluster
+    sizes = np.bincount(consensus)
+    onehot = np.zeros((n, len(sizes)), dtype=np.float32)
+    onehot[np.arange(n), consensus] = 1.0
+    within = (coassociation @ onehot)[np.arange(n), consensus] - 1.0
+    stability = np.divide(within, sizes[consensus] - 1, out=np.ones(n), where=sizes[consensus] > 1)
+    cluster_stability = pd.DataFrame({
+        'cluster': range(len(sizes)),
+        'size': np.bincount(consensus[leaves], minlength=len(sizes)),
+        'stability': np.bincount(consensus, weights=stability * weights, minlength=len(sizes)) / np.bincount(consensus, weights=weights, minlength=len(sizes)),
+    })
+
+    result = {
+        'labels': consensus[leaves],
+        'stability': stability[leaves],
+        'cluster_stability': cluster_stability,
+        'runs': runs,
+        'subsample': subsample,
+    }
+    if counts is not None:
+        result.update(_category_stability(np.asarray(counts, dtype=float), leaves, weights, consensus, run_labels))
+    return result
+
+
+# Function to get the risk category of every row under the consensus partition (cluster mean
+# of counts, as on the KMeans page) and the share of runs that gave the row the same category
+def _category_stability(counts, leaves, weights, consensus, run_labels):
+    point_counts = np.bincount(leaves, weights=counts) / np.bincount(leaves)
+
+    def categories(labels, index):
+        means = np.bincount(labels, weights=point_counts[index] * weights[index]) / np.bincount(labels, weights=weights[index])
+        return risk_category(means[labels])
+
+    category = categories(consensus, np.arange(len(consensus)))
+    hits = np.zeros(len(consensus))
+    sampled = np.zeros(len(consensus))
+    for sample, labels in run_labels:
+        hits[sample] += categories(labels, sample) == category[sample]
+        sampled[sample] += 1
+    agreement = np.divide(hits, sampled, out=np.ones(len(consensus)), where=sampled > 0)
+    return {'category': category[leaves], 'category_stability': agreement[leaves]}
+
+
+# Function to summarise a consensus result per kabupaten (mean over its rows, least stable first)
+def kabupaten_stability(data, result):
+    frame = pd.DataFrame({'KABUPATEN': np.asarray(data['KABUPATEN']), 'Stability': result['stability']})
+    columns = {'Stability': 'mean'}
+    if 'category_stability' in result:
+        frame['Category'] = result['category']
+        frame['Category Stability'] = result['category_stability']
+        columns.update({'Category': lambda values: values.mode().iloc[0], 'Category Stability': 'mean'})
+    summary = frame.groupby('KABUPATEN', sort=False).agg(columns).reset_index()
+    return summary.sort_values('Stability', kind='stable').reset_index(drop=True)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from longsor_cluster.schema import apply_schema
+
+# Dataset bencana longsor yang dipakai oleh halaman-halaman dashboard
+DATASET_JUMLAH = 'Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv'
+DATASET_SELECTION = 'UPDATE-Selection-Dataset_Longsor 2021 - 2023 - PROV JABAR.csv'
+
+# Kolom jumlah kejadian dan dampak longsor
+COUNT_COLUMNS = ['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN']
+
+# Fitur yang dipakai untuk klasterisasi KMeans dan AHC
+CLUSTER_FEATURES = COUNT_COLUMNS + ['LATITUDE', 'LONGITUDE']
+
+# Folder untuk salinan kolumnar (Feather/Arrow) dari setiap CSV
+CACHE_DIR = os.environ.get('LONGSOR_CACHE_DIR', '.longsor_cache')
+
+# Versi skema salinan kolumnar, dinaikkan jika apply_schema berubah
+SCHEMA_VERSION = b'1'
+
+# Cache per proses: dipakai bersama oleh semua halaman dan semua sesi
+_frames = {}
+_lock = threading.Lock()
+
+
+# Function to hash the source CSV so the columnar copy can be validated
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Function to convert a CSV into an uncompressed Feather file (needed for memory mapping),
+# typed with the compact schema
+def _write_columnar(file_path, cache_path, source_hash):
+    df, report = apply_schema(pd.read_csv(file_path))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'source_sha256': source_hash.encode(),
+        b'schema_version': SCHEMA_VERSION,
+        b'schema_report': json.dumps(report).encode(),
+    })
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cache_path)
+
+
+# Function to read the columnar copy and its schema report, returns None when it is missing or stale
+def _read_columnar(cache_path, source_hash):
+    if not os.path.exists(cache_path):
+        return None
+    table = feather.read_table(cache_path, memory_map=True)
+    metadata = table.schema.metadata or {}
+    if metadata.get(b'source_sha256') != source_hash.encode() or metadata.get(b'schema_version') != SCHEMA_VERSION:
+        return None
+    return table.to_pandas(split_blocks=True), json.loads(metadata[b'schema_report'])
+
+
+# Function to load a dataset once per process.
+# The CSV is parsed only when its mtime/size changed and its hash no longer matches the
+# Feather copy; the returned frame is shared, so callers must .copy() before adding columns.
+# Columns follow the compact schema (see schema.py): KABUPATEN is categorical, counts are
+# downcast integers and coordinates are float32.
+def load_dataset(file_path):
+    key = os.path.abspath(file_path)
+    stat = os.stat(key)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    entry = _frames.get(key)
+    if entry is not None and entry['signature'] == signature:
+        return entry['frame']
+
+    with _lock:
+        entry = _frames.get(key)
+        if entry is not None and entry['signature'] == signature:
+            return entry['frame']
+
+        source_hash = _file_hash(key)
+        cache_path = os.path.join(CACHE_DIR, os.path.basename(key) + '.feather')
+        columnar = _read_columnar(cache_path, source_hash)
+        if columnar is None:
+            _write_columnar(key, cache_path, source_hash)
+            columnar = _read_columnar(cache_path, source_hash)
+
+        frame, report = columnar
+        _frames[key] = {'signature': signature, 'hash': source_hash, 'frame': frame, 'schema_report': report}
+        return frame
+
+
+# Function to get the version (content hash) of a loaded dataset, used as a cache key
+def dataset_version(file_path):
+    load_dataset(file_path)
+    return _frames[os.path.abspath(file_path)]['hash']
+
+
+# Function to get the schema report of a loaded dataset (memory before/after, dropped columns)
+def schema_report(file_path):
+    load_dataset(file_path)
+    return _frames[os.path.abspath(file_path)]['schema_report']
@@ -0,0 +1,139 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Di atas jumlah daun ini dendrogram digambar terpotong (mode lastp) agar tetap terbaca
+MAX_FULL_LEAVES = int(os.environ.get('LONGSOR_DENDROGRAM_LEAVES', 200))
+
+# Jumlah klaster terakhir yang ditampilkan pada mode lastp, dan kedalaman default mode interaktif
+DEFAULT_LASTP = 30
+DEFAULT_LEVEL = 5
+
+# Jumlah merge teratas yang bisa dipilih sebagai akar subtree pada mode interaktif
+ZOOM_NODES = 30
+
+# Batas memori cache gambar/figur dendrogram (MB), yang paling lama tidak dipakai dibuang lebih dulu
+MAX_CACHE_MB = float(os.environ.get('LONGSOR_DENDROGRAM_CACHE_MB', 32))
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+# Function to hash a linkage matrix, so a render is reused for as long as the tree is the same
+def linkage_hash(Z):
+    return hashlib.blake2b(np.ascontiguousarray(Z, dtype=float).tobytes(), digest_size=16).hexdigest()
+
+
+# Function to return a cached render, building it only on a miss (size = bytes it holds)
+def _cached(key, build, size):
+    global _cache_bytes
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry[0]
+
+    value = build()
+    nbytes = size(value)
+    with _lock:
+        if key not in _cache and nbytes <= MAX_CACHE_MB * 2**20:
+            _cache[key] = (value, nbytes)
+            _cache_bytes += nbytes
+            while _cache_bytes > MAX_CACHE_MB * 2**20:
+                _, (_, evicted_size) = _cache.popitem(last=False)
+                _cache_bytes -= evicted_size
+    return value
+
+
+# Function to pick the truncation of a full dendrogram: every leaf up to MAX_FULL_LEAVES,
+# otherwise the last DEFAULT_LASTP merged clusters. Returns (truncate_mode, p).
+def auto_truncation(Z):
+    if len(Z) + 1 <= MAX_FULL_LEAVES:
+        return None, 0
+    return 'lastp', DEFAULT_LASTP
+
+
+# Function to render a dendrogram to PNG once per (tree, truncation, title).
+# truncate_mode follows scipy: None, 'lastp' (p last merged clusters) or 'level' (p levels).
+def dendrogram_png(Z, title, truncate_mode=None, p=0, xlabel='Indeks Data', ylabel='Jarak'):
+    def build():
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from scipy.cluster.hierarchy import dendrogram
+
+        figure = Figure(figsize=(8, 6))
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        dendrogram(Z, ax=ax, truncate_mode=truncate_mode, p=p)
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png')
+        return buffer.getvalue()
+
+    return _cached(('png', linkage_hash(Z), truncate_mode, p, title, xlabel, ylabel), build, len)
+
+
+# Function to list the nodes of the last ZOOM_NODES merges (the top of the hierarchy) as
+# (node id, number of leaves, merge height), root first
+def zoom_nodes(Z, count=ZOOM_NODES):
+    n = len(Z) + 1
+    rows = range(len(Z) - 1, max(len(Z) - 1 - count, -1), -1)
+    return [(n + row, int(Z[row, 3]), float(Z[row, 2])) for row in rows]
+
+
+# Function to extract the subtree under a node as its own linkage matrix.
+# Returns the sub-linkage (leaves renumbered 0..m-1) and the original leaf id of every new leaf.
+def subtree_linkage(Z, node):
+    n = len(Z) + 1
+    if node < n:
+        return np.empty((0, 4)), np.array([node])
+
+    rows = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current >= n:
+            rows.append(current - n)
+            stack.extend(int(child) for child in Z[current - n, :2])
+    rows.sort()
+
+    leaves = np.array(sorted(int(child) for row in rows for child in Z[row, :2] if child < n))
+    new_ids = {leaf: i for i, leaf in enumerate(leaves)}
+    new_ids.update({n + row: len(leaves) + i for i, row in enumerate(rows)})
+    Z_sub = np.array([[new_ids[int(Z[row, 0])], new_ids[int(Z[row, 1])], Z[row, 2], Z[row, 3]] for row in rows])
+    return Z_sub, leaves
+
+
+# Function to build a zoomable Plotly dendrogram of the subtree under a node, truncated to
+# `level` levels below it; built on demand and cached per (tree, node, level)
+def subtree_figure(Z, node, level=DEFAULT_LEVEL, title=None, xlabel='Indeks Data', ylabel='Jarak'):
+    def build():
+        import plotly.graph_objects as go
+        from scipy.cluster.hierarchy import dendrogram
+
+        Z_sub, leaves = subtree_linkage(Z, node)
+        figure = go.Figure()
+        if len(leaves) < 2:
+            figure.update_layout(title=title, xaxis_title=xlabel, yaxis_title=ylabel)
+            return figure
+
+        tree = dendrogram(Z_sub, no_plot=True, truncate_mode='level', p=level,
+                          leaf_label_func=lambda i: str(leaves[i]) if i < len(leaves) else f'({int(Z_sub[i - len(leaves), 3])})')
+        for x, y in zip(tree['icoord'], tree['dcoord']):
+            figure.add_trace(go.Scatter(x=x, y=y, mode='lines', line=dict(color='#1f77b4', width=1), hoverinfo='y', showlegend=False))
+        figure.update_layout(
+            title=title,
+            xaxis=dict(title=xlabel, tickmode='array', tickvals=[5 + 10 * i for i in range(len(tree['ivl']))], ticktext=tree['ivl']),
+            yaxis=dict(title=ylabel),
+        )
+        return figure
+
+    return _cached(('subtree', linkage_hash(Z), node, level, title, xlabel, ylabel), build,
+                   lambda figure: len(figure.to_json()))
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Batas memori cache matriks jarak (MB), entri terlama dibuang lebih dulu
+MAX_CACHE_MB = float(os.environ.get('LONGSOR_DISTANCE_CACHE_MB', 512))
+
+# Scaler yang bisa dipakai sebelum menghitung jarak (nama kelas di sklearn.preprocessing,
+# di-import saat pertama dipakai)
+SCALERS = {
+    None: None,
+    'standard': 'StandardScaler',
+}
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+# Function to fingerprint a feature matrix, used as part of every cache key
+def fingerprint(features):
+    X = np.ascontiguousarray(features, dtype=float)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(X.shape).encode())
+    digest.update(X.tobytes())
+    return digest.hexdigest()
+
+
+# Function to look up a cached matrix or compute and store it within the memory budget
+def _cached(key, compute):
+    global _cache_bytes
+    with _lock:
+        value = _cache.get(key)
+        if value is not None:
+            _cache.move_to_end(key)
+            return value
+
+    value = compute()
+    value.setflags(write=False)
+    with _lock:
+        if key not in _cache and value.nbytes <= MAX_CACHE_MB * 2**20:
+            _cache[key] = value
+            _cache_bytes += value.nbytes
+            while _cache_bytes > MAX_CACHE_MB * 2**20:
+                _, evicted = _cache.popitem(last=False)
+                _cache_bytes -= evicted.nbytes
+    return value
+
+
+# Function to create a scaler by its SCALERS name, None when the name means no scaling
+def make_scaler(name):
+    if SCALERS[name] is None:
+        return None
+    from sklearn import preprocessing
+
+    return getattr(preprocessing, SCALERS[name])()
+
+
+# Function to apply the chosen scaler to the features
+def _scaled(X, scaler):
+    if SCALERS[scaler] is None:
+        return X
+    return make_scaler(scaler).fit_transform(X)
+
+
+# Function to get the condensed distance matrix (pdist form) for a feature set, scaler and metric.
+# Computed once per configuration and shared by linkage, cophenet and silhouette.
+def condensed_distances(features, metric='euclidean', scaler=None):
+    from scipy.spatial.distance import pdist
+
+    X = np.ascontiguousarray(features, dtype=float)
+    key = ('condensed', fingerprint(X), metric, scaler)
+    return _cached(key, lambda: pdist(_scaled(X, scaler), metric=metric))
+
+
+# Function to get the square distance matrix, needed by silhouette_score(metric='precomputed')
+def square_distances(features, metric='euclidean', scaler=None):
+    from scipy.spatial.distance import squareform
+
+    X = np.ascontiguousarray(features, dtype=float)
+    key = ('square', fingerprint(X), metric, scaler)
+    return _cached(key, lambda: squareform(condensed_distances(X, metric, scaler)))
+
+
+# Function to compute the silhouette score of a labelling from the cached distances
+def precomputed_silhouette(features, labels, metric='euclidean', scaler=None):
+    from sklearn.metrics import silhouette_score
+
+    n_labels = len(np.unique(labels))
+    if n_labels < 2 or n_labels >= len(labels):
+        return np.nan
+    return silhouette_score(square_distances(features, metric, scaler), labels, metric='precomputed')
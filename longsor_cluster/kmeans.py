@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.quality import silhouette_estimate
+
+# Cara sweep k: 'independent' (setiap k di-fit dari awal dengan N_INIT restart k-means++, dipakai
+# untuk label klaster di halaman) atau 'warm' (k+1 dimulai dari centroid k ditambah satu split,
+# satu jalur k=1..max; lebih cepat tetapi bisa berakhir di solusi dengan inersia lebih tinggi)
+SWEEP_MODES = ['independent', 'warm']
+SWEEP_MODE = os.environ.get('LONGSOR_KMEANS_SWEEP', 'independent')
+
+# Jumlah restart k-means++ untuk fit independen (default scikit-learn 1.2 yang dipakai aplikasi;
+# ditulis eksplisit agar hasil sama di versi yang default-nya 'auto')
+N_INIT = 10
+
+
+# Function to score a fitted model: inertia (elbow) and silhouette (exact when it fits the
+# latency budget, otherwise an estimate with its confidence interval)
+def score_model(X, model):
+    return {
+        'num_clusters': len(model.cluster_centers_),
+        'inertia': model.inertia_,
+        **silhouette_estimate(X, model.labels_, centroids=model.cluster_centers_),
+    }
+
+
+# Function to get the k+1 starting centroids from a fitted model: its centroids plus the
+# point farthest from its centroid in the cluster with the largest squared error
+def split_init(X, model):
+    labels = model.labels_
+    centers = model.cluster_centers_
+    squared = ((X - centers[labels]) ** 2).sum(axis=1)
+    worst = np.argmax(np.bincount(labels, weights=squared, minlength=len(centers)))
+    members = np.flatnonzero(labels == worst)
+    return np.vstack([centers, X[members[np.argmax(squared[members])]]])
+
+
+# Function to fit KMeans for every k in k_values, without scoring.
+# mode='warm' follows one path k=1..max(k_values): every k starts from the k-1 centroids plus
+# one split and runs a single Lloyd fit, so a k gets the same labels whichever k_values asked
+# for it, but a single start can end in a worse local optimum (higher inertia) than restarts.
+# mode='independent' fits every k from scratch (N_INIT k-means++ restarts).
+def kmeans_path(features, k_values=range(1, 11), random_state=42, mode=SWEEP_MODE):
+    from sklearn.cluster import KMeans
+
+    X = np.asarray(features, dtype=float)
+    k_values = sorted(k_values)
+    if mode == 'independent':
+        return {k: KMeans(n_clusters=k, n_init=N_INIT, random_state=random_state).fit(X) for k in k_values}
+
+    models = {}
+    model = KMeans(n_clusters=1, n_init=1, random_state=random_state).fit(X)
+    for k in range(1, k_values[-1] + 1):
+        if k > 1:
+            model = KMeans(n_clusters=k, init=split_init(X, model), n_init=1, random_state=random_state).fit(X)
+        if k in k_values:
+            models[k] = model
+    return models
+
+
+# Function to fit KMeans exactly once for every k in k_values.
+# Returns the fitted models by k (labels_, cluster_centers_, inertia_) and one metrics table
+# with inertia (elbow) and silhouette; exact silhouettes share one cached distance matrix.
+def kmeans_sweep(features, k_values=range(1, 11), random_state=42, mode=SWEEP_MODE):
+    X = np.asarray(features, dtype=float)
+    models = kmeans_path(X, k_values, random_state, mode)
+    rows = [score_model(X, model) for model in models.values()]
+    return models, pd.DataFrame(rows)
@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+
+# Jumlah maksimum hasil panel yang disimpan di memori (semua sesi), yang paling lama tidak
+# dipakai dibuang lebih dulu
+MAX_ENTRIES = 128
+
+# Cache per proses: hasil compute panel per kunci (versi dataset, nama panel, ...)
+_results = OrderedDict()
+_lock = threading.Lock()
+
+
+# Function to memoize the result of a panel's compute function, shared by every rerun and
+# session; the key should include the dataset version
+def memoized(key, compute):
+    with _lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+
+    value = compute()
+    with _lock:
+        value = _results.setdefault(key, value)
+        while len(_results) > MAX_ENTRIES:
+            _results.popitem(last=False)
+    return value
+
+
+# Function to show a panel whose render function only runs while the panel is open.
+# Streamlit runs the body of a collapsed st.expander on every rerun, so the panel header is a
+# toggle (closed by default, its state kept per session) and the content is drawn in a bordered
+# container below it only when the toggle is on.
+def lazy_panel(label, render, key, opened=False):
+    import streamlit as st
+
+    if st.toggle(label, value=opened, key=f'panel_{key}'):
+        with st.container(border=True):
+            render()
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+from longsor_cluster.tiles import TILE_LAYERS, tile_url
+
+# Peta dasar di-cache dan dipakai bersama antar sesi; st_folium menambah dan membaca
+# layer seleksi pada objek peta itu, jadi pemanggilannya diserialkan
+_interactive_lock = threading.Lock()
+
+# Jumlah desimal kolom float32 saat dikirim ke peta (~1 m untuk koordinat)
+FLOAT32_DECIMALS = 5
+
+# Isi popup untuk halaman pemetaan klaster (label, kolom)
+CLUSTER_POPUP_ROWS = [
+    ('Cluster Number', 'cluster'),
+    ('KABUPATEN', 'KABUPATEN'),
+    ('JUMLAH_LONGSOR', 'JUMLAH_LONGSOR'),
+    ('JIWA_TERDAMPAK', 'JIWA_TERDAMPAK'),
+    ('JIWA_MENINGGAL', 'JIWA_MENINGGAL'),
+    ('RUSAK_TERDAMPAK', 'RUSAK_TERDAMPAK'),
+    ('RUSAK_RINGAN', 'RUSAK_RINGAN'),
+    ('RUSAK_SEDANG', 'RUSAK_SEDANG'),
+    ('RUSAK_BERAT', 'RUSAK_BERAT'),
+    ('TERTIMBUN', 'TERTIMBUN'),
+]
+
+
+# Function to get a column as a Python list; float32 columns (coordinates in the compact schema)
+# are rounded to their precision so popups do not show float32 noise such as 106.82454681
+def _column_list(values):
+    if values.dtype == np.float32:
+        return np.round(values.to_numpy(dtype=float), FLOAT32_DECIMALS).tolist()
+    return values.tolist()
+
+
+# Function to turn a frame into a GeoJSON FeatureCollection.
+# Columns are converted to Python lists once (no iterrows, no per-row Series).
+def to_feature_collection(df, properties, lat='LATITUDE', lon='LONGITUDE', extra=None):
+    columns = {column: _column_list(df[column]) for column in properties}
+    for name, values in (extra or {}).items():
+        columns[name] = np.asarray(values).tolist()
+
+    names = list(columns)
+    coordinates = list(map(list, zip(_column_list(df[lon]), _column_list(df[lat]))))
+    features = [
+        {'type': 'Feature', 'id': i, 'geometry': {'type': 'Point', 'coordinates': point}, 'properties': dict(zip(names, values))}
+        for i, (point, *values) in enumerate(zip(coordinates, *columns.values()))
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+# Function to add Google satellite and label tiles, served through the local tile proxy when configured
+def add_google_maps(m):
+    import folium
+
+    for layer in ('satellite', 'labels'):
+        attr = TILE_LAYERS[layer][1]
+        folium.TileLayer(tiles=tile_url(layer), attr=attr, name=attr, overlay=True, control=True).add_to(m)
+    return m
+
+
+# Function to get heatmap points for folium.plugins.HeatMap
+def heat_points(df, lat='LATITUDE', lon='LONGITUDE'):
+    return df[[lat, lon]].to_numpy(dtype=float).tolist()
+
+
+# Marker layer drawn from one GeoJSON FeatureCollection.
+# Popups are rendered in the browser from one shared template and the feature properties,
+# and the selected kabupaten is styled through the `_selected` property.
+# (Bootstrap's list-group CSS is already loaded by folium.Map.)
+class MarkerLayer(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }}_icons = {
+            normal: L.AwesomeMarkers.icon({icon: {{ this.icon|tojson }}, prefix: 'fa', markerColor: {{ this.color|tojson }}}),
+            selected: L.AwesomeMarkers.icon({icon: {{ this.icon|tojson }}, prefix: 'fa', markerColor: {{ this.selected_color|tojson }}})
+        };
+        var {{ this.get_name() }}_fill = function(text, props) {
+            return String(text).replace(/\\{(\\w+)\\}/g, function(match, key) { return props[key]; });
+        };
+        var {{ this.get_name() }}_popup = function(props) {
+            var rows = {{ this.popup_rows|tojson }}.map(function(row) {
+                return '<li class="list-group-item"><b>' + row[0] + ':</b> ' + props[row[1]] + '</li>';
+            });
+            return "<div style='width:400px; height:300px;'><ul class='list-group'>"
+                + '<li class="list-group-item active" aria-current="true"><h3 class="mb-0">'
+                + {{ this.get_name() }}_fill({{ this.popup_title|tojson }}, props) + '</h3></li>'
+                + rows.join('') + '</ul></div>';
+        };
+        var {{ this.get_name() }} = L.geoJSON({{ this.data|tojson }}, {
+            pointToLayer: function(feature, latlng) {
+                var icons = {{ this.get_name() }}_icons;
+                return L.marker(latlng, {icon: feature.properties._selected ? icons.selected : icons.normal});
+            },
+            onEachFeature: function(feature, layer) {
+                layer.bindTooltip(String(feature.properties[{{ this.tooltip|tojson }}]));
+                layer.bindPopup(function() { return {{ this.get_name() }}_popup(feature.properties); },
+                                {maxWidth: {{ this.max_width }}});
+            }
+        }).addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+        """)
+
+    def __init__(self, df, popup_title, popup_rows, tooltip='KABUPATEN', icon='exclamation-triangle',
+                 color='orange', selected_color='red', selected_kabupaten=None, max_width=600):
+        super().__init__()
+        self._name = 'MarkerLayer'
+        properties = list(dict.fromkeys([tooltip] + [column for _, column in popup_rows]))
+        selected = (df['KABUPATEN'] == selected_kabupaten).to_numpy() if selected_kabupaten is not None else np.zeros(len(df), dtype=bool)
+        self.data = to_feature_collection(df, properties, extra={'_selected': selected})
+        self.popup_title = popup_title
+        self.popup_rows = [list(row) for row in popup_rows]
+        self.tooltip = tooltip
+        self.icon = icon
+        self.color = color
+        self.selected_color = selected_color
+        self.max_width = max_width
+
+
+# Function to build the small delta layer that highlights the selected kabupaten.
+# The highlight marker is not interactive, so clicks still reach the base marker below it.
+def selection_layer(df, selected_kabupaten, icon='exclamation-triangle', color='red'):
+    import folium
+
+    group = folium.FeatureGroup(name='Selected Kabupaten', control=False)
+    selected = df.loc[df['KABUPATEN'] == selected_kabupaten, ['LATITUDE', 'LONGITUDE']]
+    for lat, lon in selected.itertuples(index=False):
+        folium.Marker(
+            location=[float(lat), float(lon)],
+            icon=folium.Icon(color=color, icon=icon, prefix='fa'),
+            interactive=False,
+            z_index_offset=1000,
+        ).add_to(group)
+    return group
+
+
+# Function to show a cached base map with st_folium and apply only the selection layer on top.
+# The base map document stays the same between reruns, so the iframe (and its zoom/pan) is kept;
+# only the clicked marker's tooltip (the KABUPATEN name) is sent back. Returns that name or None.
+def show_interactive_map(base_map, selection, key, width, height):
+    from streamlit_folium import st_folium
+
+    with _interactive_lock:
+        try:
+            state = st_folium(base_map, key=key, width=width, height=height,
+                              feature_group_to_add=selection,
+                              returned_objects=['last_object_clicked_tooltip'])
+        finally:
+            # st_folium attaches the selection layer to the map; detach it so the cached base map is unchanged
+            base_map._children.pop(selection.get_name(), None)
+    return (state or {}).get('last_object_clicked_tooltip')
+
+
+# Function to turn a map click into a new selectbox value (applied by apply_clicked_kabupaten
+# on the next rerun, before the selectbox is created)
+def sync_clicked_kabupaten(clicked, selected_kabupaten, selectbox_key):
+    import streamlit as st
+
+    last_click_key = f'{selectbox_key}_last_click'
+    if clicked and clicked != selected_kabupaten and clicked != st.session_state.get(last_click_key):
+        st.session_state[last_click_key] = clicked
+        st.session_state[f'{selectbox_key}_clicked'] = clicked
+        st.rerun()
+
+
+# Function to apply a kabupaten clicked on the map in the previous run to the selectbox state
+def apply_clicked_kabupaten(selectbox_key):
+    import streamlit as st
+
+    clicked = st.session_state.pop(f'{selectbox_key}_clicked', None)
+    if clicked is not None:
+        st.session_state[selectbox_key] = clicked
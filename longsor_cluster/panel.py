@@ -0,0 +1,62 @@
+import os
+import threading
+
+from longsor_cluster.data import COUNT_COLUMNS, dataset_version, load_dataset
+
+# Cache per proses: satu panel per (file, versi dataset)
+_panels = {}
+_lock = threading.Lock()
+
+
+# Function to build the (KABUPATEN, TAHUN) panel of a per-year dataset:
+# - indexed: every count column per (KABUPATEN, TAHUN), summed over the rows of that pair (one
+#   row per pair in the kabupaten tables, several in event- or village-level data)
+# - partitions: the rows of every year (frames in the original row order)
+# - deltas: per year, the change of every count column against the previous year, aligned by
+#   KABUPATEN (a kabupaten or year without data counts as 0), sorted by JUMLAH_LONGSOR change
+# - totals: the sum of every count column per year, and total_deltas against the previous year
+def build_panel(df):
+    years = sorted(df['TAHUN'].unique().tolist())
+    partitions = {year: frame for year, frame in df.groupby('TAHUN', sort=True)}
+    indexed = df.groupby(['KABUPATEN', 'TAHUN'], sort=True, observed=True)[COUNT_COLUMNS].sum()
+
+    deltas = {}
+    for year in years:
+        current = indexed.xs(year, level='TAHUN')
+        previous = indexed.xs(year - 1, level='TAHUN') if year - 1 in partitions else current.iloc[0:0]
+        delta = current.sub(previous.reindex(current.index), fill_value=0).astype('int64')
+        deltas[year] = delta.sort_values('JUMLAH_LONGSOR', ascending=False, kind='stable')
+
+    totals = indexed.groupby(level='TAHUN').sum()
+    previous_totals = totals.reindex(totals.index - 1).fillna(0).set_axis(totals.index)
+    total_deltas = totals.sub(previous_totals).astype('int64')
+    return {'years': years, 'indexed': indexed, 'partitions': partitions, 'deltas': deltas,
+            'totals': totals, 'total_deltas': total_deltas}
+
+
+# Function to get the panel of a dataset, built once per dataset version
+def load_panel(file_path):
+    key = (os.path.abspath(file_path), dataset_version(file_path))
+    panel = _panels.get(key)
+    if panel is not None:
+        return panel
+    with _lock:
+        panel = _panels.get(key)
+        if panel is None:
+            for stale in [stale for stale in _panels if stale[0] == key[0]]:
+                del _panels[stale]
+            panel = _panels[key] = build_panel(load_dataset(file_path))
+    return panel
+
+
+# Function to get the rows of one year (empty frame for a year without data)
+def year_rows(panel, year):
+    partition = panel['partitions'].get(year)
+    if partition is None:
+        return next(iter(panel['partitions'].values())).iloc[0:0]
+    return partition
+
+
+# Function to get the count value and the year-over-year change of one kabupaten, column and year
+def value_and_delta(panel, kabupaten, year, column='JUMLAH_LONGSOR'):
+    return panel['indexed'].at[(kabupaten, year), column], panel['deltas'][year].at[kabupaten, column]
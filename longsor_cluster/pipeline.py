@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.ahc import LINKAGE_METHODS, ahc_sweep, cluster_tree, cophenetic_correlation, cut_k
+from longsor_cluster.data import CLUSTER_FEATURES, dataset_version, load_dataset
+from longsor_cluster.kmeans import SWEEP_MODE, kmeans_sweep
+from longsor_cluster.preprocess import PREPROCESS_CONFIG, transformed_features
+from longsor_cluster.quality import SILHOUETTE_COLUMNS, exact_silhouette_scores
+
+# Folder artefak hasil pipeline (satu subfolder per dataset dan versi dataset)
+ARTIFACT_DIR = os.environ.get('LONGSOR_ARTIFACT_DIR', 'artifacts')
+
+# Versi format artefak, dinaikkan jika isi/format file berubah
+ARTIFACT_FORMAT = 5
+
+# Fitur peta klaster AHC (halaman 5 mengelompokkan berdasarkan lokasi)
+AHC_MAP_FEATURES = ['LATITUDE', 'LONGITUDE']
+
+
+# Function to parse a k range such as "2..10" (or a single number)
+def parse_range(text):
+    start, _, end = text.partition('..')
+    return range(int(start), int(end or start) + 1)
+
+
+# Function to get the artifact folder of a dataset version
+def artifact_dir(file_path, version, root=ARTIFACT_DIR):
+    name = re.sub(r'[^A-Za-z0-9]+', '-', os.path.splitext(os.path.basename(file_path))[0]).strip('-').lower()
+    return os.path.join(root, name, version[:16])
+
+
+# Function to write the KMeans artifacts: labels per k, centroids per k and the metric table
+def _write_kmeans(out, data, features, k_values):
+    models, metrics = kmeans_sweep(features, k_values)
+
+    labels = pd.DataFrame({'KABUPATEN': data['KABUPATEN']})
+    centroids = []
+    for k, model in models.items():
+        labels[f'k_{k}'] = model.labels_
+        frame = pd.DataFrame(model.cluster_centers_, columns=CLUSTER_FEATURES)
+        frame.insert(0, 'cluster', range(k))
+        frame.insert(0, 'num_clusters', k)
+        centroids.append(frame)
+
+    labels.to_csv(os.path.join(out, 'kmeans_labels.csv'), index=False)
+    pd.concat(centroids).to_csv(os.path.join(out, 'kmeans_centroids.csv'), index=False)
+    metrics.to_csv(os.path.join(out, 'kmeans_metrics.csv'), index=False)
+    return ['kmeans_labels.csv', 'kmeans_centroids.csv', 'kmeans_metrics.csv']
+
+
+# Function to write the AHC artifacts: linkage matrices with their row -> leaf map, map labels
+# per (method, k), silhouette table and cophenetic correlation per method. For large data the linkage
+# matrices and the cophenetic correlation are at the BIRCH micro-cluster level.
+def _write_ahc(out, data, features, map_features, k_values, methods):
+    files = []
+    labels = pd.DataFrame({'KABUPATEN': data['KABUPATEN']})
+    cophenetic = []
+    for method in methods:
+        Z, leaves = cluster_tree(features, method)
+        Z_map, map_leaves = cluster_tree(map_features, method)
+        np.save(os.path.join(out, f'ahc_linkage_{method}.npy'), Z)
+        np.save(os.path.join(out, f'ahc_leaves_{method}.npy'), leaves)
+        np.save(os.path.join(out, f'ahc_map_linkage_{method}.npy'), Z_map)
+        files += [f'ahc_linkage_{method}.npy', f'ahc_leaves_{method}.npy', f'ahc_map_linkage_{method}.npy']
+
+        for k in k_values:
+            labels[f'{method}_k_{k}'] = cut_k(Z_map, k)[map_leaves]
+        cophenetic.append({'method': method, 'ccc': cophenetic_correlation(features, method)})
+
+    _, metrics = ahc_sweep(features, methods, k_values)
+    labels.to_csv(os.path.join(out, 'ahc_labels.csv'), index=False)
+    metrics.to_csv(os.path.join(out, 'ahc_metrics.csv'), index=False)
+    pd.DataFrame(cophenetic).to_csv(os.path.join(out, 'ahc_cophenet.csv'), index=False)
+    return files + ['ahc_labels.csv', 'ahc_metrics.csv', 'ahc_cophenet.csv']
+
+
+# Function to run the clustering pipeline without Streamlit and write the artifacts.
+# The manifest is written last, so a folder without manifest.json is an unfinished run.
+def run_pipeline(file_path, algorithms=('kmeans', 'ahc'), k_values=range(2, 11), methods=LINKAGE_METHODS, root=ARTIFACT_DIR):
+    data = load_dataset(file_path)
+    version = dataset_version(file_path)
+    out = artifact_dir(file_path, version, root)
+    os.makedirs(out, exist_ok=True)
+
+    features = transformed_features(file_path)
+    files = []
+    if 'kmeans' in algorithms:
+        files += _write_kmeans(out, data, features, k_values)
+    if 'ahc' in algorithms:
+        files += _write_ahc(out, data, features, transformed_features(file_path, AHC_MAP_FEATURES), k_values, methods)
+
+    manifest = {
+        'format': ARTIFACT_FORMAT,
+        'dataset': os.path.basename(file_path),
+        'dataset_version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'algorithms': list(algorithms),
+        'k_values': list(k_values),
+        'methods': list(methods),
+        'features': CLUSTER_FEATURES,
+        'map_features': AHC_MAP_FEATURES,
+        'preprocess': PREPROCESS_CONFIG,
+        'kmeans_sweep': SWEEP_MODE,
+        'files': files,
+    }
+    tmp_path = os.path.join(out, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out, 'manifest.json'))
+    return out
+
+
+# Function to compute the exact silhouette of every (algorithm, k) in one blocked pass over the
+# distances (bounded memory, for audits) and write silhouette_exact.csv next to the artifacts
+def run_silhouette_audit(file_path, algorithms=('kmeans', 'ahc'), k_values=range(2, 11), methods=LINKAGE_METHODS, root=ARTIFACT_DIR):
+    out = artifact_dir(file_path, dataset_version(file_path), root)
+    os.makedirs(out, exist_ok=True)
+
+    features = transformed_features(file_path)
+    runs = []
+    if 'kmeans' in algorithms:
+        models, _ = kmeans_sweep(features, k_values)
+        runs += [({'algorithm': 'kmeans', 'method': None, 'num_clusters': k}, model.labels_) for k, model in models.items()]
+    if 'ahc' in algorithms:
+        labels, _ = ahc_sweep(features, methods, k_values)
+        runs += [({'algorithm': 'ahc', 'method': method, 'num_clusters': k}, cut) for (method, k), cut in labels.items()]
+
+    scores = exact_silhouette_scores(features, [cut for _, cut in runs])
+    audit = pd.DataFrame([{**run, 'silhouette_score': score} for (run, _), score in zip(runs, scores)])
+    path = os.path.join(out, 'silhouette_exact.csv')
+    audit.to_csv(path, index=False)
+    return path
+
+
+# Function to load the artifacts of the current dataset version, None when the pipeline
+# has not been run for it. Returns the results keyed like the precompute cache.
+def load_artifacts(file_path, root=ARTIFACT_DIR):
+    out = artifact_dir(file_path, dataset_version(file_path), root)
+    manifest_path = os.path.join(out, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != ARTIFACT_FORMAT or manifest.get('preprocess') != PREPROCESS_CONFIG:
+        return None
+    if 'kmeans' in manifest['algorithms'] and manifest.get('kmeans_sweep') != SWEEP_MODE:
+        return None
+
+    results = {}
+    if 'kmeans' in manifest['algorithms']:
+        labels = pd.read_csv(os.path.join(out, 'kmeans_labels.csv'))
+        centroids = pd.read_csv(os.path.join(out, 'kmeans_centroids.csv'))
+        for row in pd.read_csv(os.path.join(out, 'kmeans_metrics.csv')).to_dict('records'):
+            k = int(row['num_clusters'])
+            results[('kmeans', k)] = {
+                **row,
+                'num_clusters': k,
+                'labels': labels[f'k_{k}'].to_numpy(),
+                'centroids': centroids.loc[centroids['num_clusters'] == k, CLUSTER_FEATURES].to_numpy(),
+            }
+    if 'ahc' in manifest['algorithms']:
+        labels = pd.read_csv(os.path.join(out, 'ahc_labels.csv'))
+        metrics = pd.read_csv(os.path.join(out, 'ahc_metrics.csv'))
+        cophenetic = pd.read_csv(os.path.join(out, 'ahc_cophenet.csv')).set_index('method')['ccc']
+        for method in manifest['methods']:
+            for k in manifest['k_values']:
+                results[('ahc', method, k)] = labels[f'{method}_k_{k}'].to_numpy()
+            scores = metrics[metrics['method'] == method]
+            results[('ahc_silhouette', method)] = scores[['num_clusters'] + SILHOUETTE_COLUMNS].reset_index(drop=True)
+            results[('tree', method)] = {
+                'linkage': np.load(os.path.join(out, f'ahc_linkage_{method}.npy')),
+                'leaves': np.load(os.path.join(out, f'ahc_leaves_{method}.npy')),
+                'ccc': float(cophenetic[method]),
+            }
+    return results
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from longsor_cluster.ahc import LINKAGE_METHODS, MAX_EXACT_ROWS, MAX_MICRO_CLUSTERS, ahc_sweep, cluster_tree, cophenetic_correlation, cut_k
+from longsor_cluster.consensus import CONSENSUS_RUNS, CONSENSUS_SUBSAMPLE, consensus_clustering
+from longsor_cluster.data import dataset_version, load_dataset
+from longsor_cluster.kmeans import SWEEP_MODE, kmeans_sweep
+from longsor_cluster.pipeline import AHC_MAP_FEATURES, load_artifacts
+from longsor_cluster.preprocess import PREPROCESS_CONFIG, transformed_features
+from longsor_cluster.quality import CENTROID_MIN_ROWS, LATENCY_BUDGET, SILHOUETTE_COLUMNS
+from longsor_cluster.store import load_entry, save_entry, stored_entries
+
+logger = logging.getLogger(__name__)
+
+# Pilihan yang bisa diminta dari UI (slider jumlah klaster dan pilihan linkage)
+KMEANS_K = range(1, 11)
+AHC_K = range(2, 11)
+
+# Jumlah worker untuk precompute di latar belakang
+WORKERS = int(os.environ.get('LONGSOR_PRECOMPUTE_WORKERS', os.cpu_count() or 2))
+
+# Konfigurasi yang menentukan hasil fit; hasil di model store dengan konfigurasi lain tidak dipakai
+MODEL_CONFIG = {
+    'preprocess': PREPROCESS_CONFIG,
+    'random_state': 42,
+    'kmeans_sweep': SWEEP_MODE,
+    'ahc_max_exact_rows': MAX_EXACT_ROWS,
+    'ahc_micro_clusters': MAX_MICRO_CLUSTERS,
+    'silhouette_budget_s': LATENCY_BUDGET,
+    'silhouette_centroid_rows': CENTROID_MIN_ROWS,
+    'consensus_runs': CONSENSUS_RUNS,
+    'consensus_subsample': CONSENSUS_SUBSAMPLE,
+}
+
+# Cache hasil bersama (semua sesi), job yang sedang berjalan dan entri model store yang belum
+# dimuat, dikunci per (file, versi, ...)
+_results = {}
+_futures = {}
+_stored = {}
+_versions = {}
+_lock = threading.Lock()
+_executor = None
+
+
+# Function to get the shared thread pool
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='longsor-precompute')
+    return _executor
+
+
+# Job: the KMeans fits for k_values (one warm-started path, or independent fits)
+def _kmeans_job(prefix, k_values):
+    models, metrics = kmeans_sweep(transformed_features(prefix[0]), k_values)
+    return {
+        prefix + ('kmeans', k): {'labels': model.labels_, 'centroids': model.cluster_centers_, **row}
+        for (k, model), row in zip(models.items(), metrics.to_dict('records'))
+    }
+
+
+# Job: one linkage tree per method for the map labels (every k) and one for the silhouette sweep
+# and the dendrogram (with its cophenetic correlation)
+def _ahc_job(prefix, method):
+    features = transformed_features(prefix[0])
+    map_features = transformed_features(prefix[0], AHC_MAP_FEATURES)
+    Z, leaves = cluster_tree(map_features, method)
+    results = {prefix + ('ahc', method, k): cut_k(Z, k)[leaves] for k in AHC_K}
+    _, scores = ahc_sweep(features, [method], AHC_K)
+    results[prefix + ('ahc_silhouette', method)] = scores[['num_clusters'] + SILHOUETTE_COLUMNS]
+    results[prefix + ('tree', method)] = _tree(features, method)
+    return results
+
+
+# Function to get the linkage tree of a method with its row -> leaf map and cophenetic correlation
+def _tree(features, method):
+    Z, leaves = cluster_tree(features, method)
+    return {'linkage': Z, 'leaves': leaves, 'ccc': cophenetic_correlation(features, method)}
+
+
+# Function to persist results in the model store, so a restarted process starts warm.
+# A failed write only costs a refit after a restart, so it is logged and the other results are still saved.
+def _persist(results):
+    for (file_path, version, *key), value in results.items():
+        try:
+            save_entry(file_path, version, MODEL_CONFIG, tuple(key), value)
+        except Exception:
+            logger.exception('Could not save %s to the model store', tuple(key))
+
+
+# Function to move the results of a finished job into the shared cache and the model store
+def _publish(future):
+    if future.exception() is None:
+        with _lock:
+            _results.update(future.result())
+        _persist(future.result())
+
+
+# Function to submit a job and register the keys it will publish
+def _submit(keys, job, *args):
+    future = _pool().submit(job, *args)
+    with _lock:
+        for key in keys:
+            _futures[key] = future
+    future.add_done_callback(_publish)
+
+
+# Function to start precomputing every (algorithm, k, linkage) combination for a dataset.
+# Safe to call on every rerun: it only schedules work once per dataset version, and drops
+# the results of an older version of the same file. Results in the model store (fits of an
+# earlier process) are loaded lazily on first use, results written by the headless pipeline
+# (python -m longsor_cluster run) are loaded; only the rest is recomputed.
+def start_precompute(file_path):
+    version = dataset_version(file_path)
+    with _lock:
+        if _versions.get(file_path) == version:
+            return
+        _versions[file_path] = version
+        for store in (_results, _futures, _stored):
+            for key in [key for key in store if key[0] == file_path and key[1] != version]:
+                del store[key]
+
+    prefix = (file_path, version)
+    stored = stored_entries(file_path, version, MODEL_CONFIG)
+    artifacts = {key: value for key, value in (load_artifacts(file_path) or {}).items() if key not in stored}
+    with _lock:
+        _stored.update({prefix + key: path for key, path in stored.items()})
+        _results.update({prefix + key: value for key, value in artifacts.items()})
+    available = set(stored) | set(artifacts)
+
+    # Features are transformed in the jobs (sklearn is only imported there, not before first paint).
+    # A warm-started sweep is one path over every k; independent fits run in parallel
+    missing = [k for k in KMEANS_K if ('kmeans', k) not in available]
+    for k_values in ([missing] if SWEEP_MODE == 'warm' else [[k] for k in missing]):
+        if k_values:
+            _submit([prefix + ('kmeans', k) for k in k_values], _kmeans_job, prefix, k_values)
+    for method in LINKAGE_METHODS:
+        keys = [('ahc', method, k) for k in AHC_K] + [('ahc_silhouette', method), ('tree', method)]
+        if not all(key in available for key in keys):
+            _submit([prefix + key for key in keys], _ahc_job, prefix, method)
+
+
+# Function to precompute a dataset and wait until every result is in the model store
+# (e.g. before a deploy, so the first visitor gets warm results). Returns the number of fits run.
+def warm_store(file_path):
+    start_precompute(file_path)
+    with _lock:
+        futures = {future for key, future in _futures.items() if key[0] == file_path}
+    for future in futures:
+        future.result()
+    return len(futures)
+
+
+# Function to read a result from the shared cache; loads it from the model store, waits for
+# a running job, and computes on demand (and publishes) only on a miss
+def get_result(key, compute):
+    with _lock:
+        if key in _results:
+            return _results[key]
+        future = _futures.get(key)
+        stored = key in _stored
+
+    if stored:
+        value = load_entry(key[0], key[1], MODEL_CONFIG, key[2:])
+        if value is not None:
+            with _lock:
+                _results[key] = value
+            return value
+
+    if future is not None:
+        future.result()
+        with _lock:
+            if key in _results:
+                return _results[key]
+
+    value = compute()
+    with _lock:
+        _results[key] = value
+    _persist({key: value})
+    return value
+
+
+# Function to get the KMeans result (labels, centroids, inertia, silhouette) for k
+def kmeans_result(file_path, k):
+    prefix = (file_path, dataset_version(file_path))
+    return get_result(prefix + ('kmeans', k),
+                      lambda: _kmeans_job(prefix, [k])[prefix + ('kmeans', k)])
+
+
+# Function to get the KMeans elbow/silhouette table (with confidence intervals) for k=1..max_clusters
+def kmeans_metrics(file_path, max_clusters=10):
+    rows = []
+    for k in range(1, max_clusters + 1):
+        result = kmeans_result(file_path, k)
+        rows.append({name: result[name] for name in ['num_clusters', 'inertia'] + SILHOUETTE_COLUMNS})
+    return pd.DataFrame(rows)
+
+
+# Function to get the AHC map labels for a linkage method and k
+def ahc_labels(file_path, method, k):
+    prefix = (file_path, dataset_version(file_path))
+
+    def compute():
+        Z, leaves = cluster_tree(transformed_features(file_path, AHC_MAP_FEATURES), method)
+        return cut_k(Z, k)[leaves]
+
+    return get_result(prefix + ('ahc', method, k), compute)
+
+
+# Function to get the AHC silhouette table (k=2..10, with confidence intervals) for a linkage method
+def ahc_silhouette(file_path, method):
+    prefix = (file_path, dataset_version(file_path))
+
+    def compute():
+        _, scores = ahc_sweep(transformed_features(file_path), [method], AHC_K)
+        return scores[['num_clusters'] + SILHOUETTE_COLUMNS]
+
+    return get_result(prefix + ('ahc_silhouette', method), compute)
+
+
+# Function to get the linkage tree of a method on the clustering features (dendrogram, CCC and
+# the row -> leaf map), shared with the silhouette sweep
+def ahc_tree(file_path, method):
+    prefix = (file_path, dataset_version(file_path))
+    return get_result(prefix + ('tree', method), lambda: _tree(transformed_features(file_path), method))
+
+
+# Function to get the consensus analysis of the KMeans map (clustering features, with the risk
+# category stability) or of the AHC map (location features) for k; computed on first use
+def consensus_result(file_path, algorithm, k, method='average'):
+    prefix = (file_path, dataset_version(file_path))
+    if algorithm == 'kmeans':
+        return get_result(prefix + ('consensus', 'kmeans', k), lambda: consensus_clustering(
+            transformed_features(file_path), k, counts=load_dataset(file_path)['JUMLAH_LONGSOR']))
+    return get_result(prefix + ('consensus', 'ahc', method, k), lambda: consensus_clustering(
+        transformed_features(file_path, AHC_MAP_FEATURES), k, 'ahc', method))
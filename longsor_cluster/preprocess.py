@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from longsor_cluster.data import CLUSTER_FEATURES, COUNT_COLUMNS, dataset_version, load_dataset
+from longsor_cluster.distance import make_scaler
+from longsor_cluster.store import load_entry, save_entry
+
+# Konfigurasi preprocessing fitur klasterisasi, sama untuk semua halaman dan job headless:
+# imputasi NaN, transformasi log1p kolom jumlah (opsional) dan scaler (None = satuan asli)
+PREPROCESS_CONFIG = {
+    'impute': os.environ.get('LONGSOR_IMPUTE', 'mean'),
+    'log_counts': os.environ.get('LONGSOR_LOG_COUNTS', '0') == '1',
+    'scaler': os.environ.get('LONGSOR_SCALER') or None,
+}
+
+# Cache per proses: pipeline yang sudah di-fit dan matriks hasil transformasinya
+_fitted = {}
+_lock = threading.Lock()
+
+
+# Function to apply log1p to the given column positions (module level so the pipeline can be pickled)
+def log_columns(X, columns):
+    X = np.array(X, dtype=float)
+    X[:, columns] = np.log1p(X[:, columns])
+    return X
+
+
+# Function to get a short key of a (features, config) combination
+def preprocess_key(features, config=PREPROCESS_CONFIG):
+    text = json.dumps({'features': list(features), **config}, sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+# Function to build the (unfitted) preprocessing pipeline for a list of feature columns
+def build_pipeline(features, config=PREPROCESS_CONFIG):
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer
+
+    steps = [('impute', SimpleImputer(strategy=config['impute'], keep_empty_features=True))]
+    counts = [i for i, column in enumerate(features) if column in COUNT_COLUMNS]
+    if config['log_counts'] and counts:
+        steps.append(('log', FunctionTransformer(log_columns, kw_args={'columns': counts})))
+    if config['scaler'] is not None:
+        steps.append(('scale', make_scaler(config['scaler'])))
+    return Pipeline(steps)
+
+
+# Function to fit the pipeline once per dataset version and configuration; the fitted pipeline
+# (scaler state) is persisted in the model store and reused by later processes
+def fit_preprocess(file_path, features=CLUSTER_FEATURES, config=PREPROCESS_CONFIG):
+    return _load(file_path, features, config)['pipeline']
+
+
+# Function to get the transformed feature matrix shared by the pages and the headless jobs
+# (read-only float64, rows in dataset order)
+def transformed_features(file_path, features=CLUSTER_FEATURES, config=PREPROCESS_CONFIG):
+    return _load(file_path, features, config)['matrix']
+
+
+# Function to fit (or load) the pipeline and transform the dataset, once per process
+def _load(file_path, features, config):
+    version = dataset_version(file_path)
+    key = preprocess_key(features, config)
+    cache_key = (os.path.abspath(file_path), version, key)
+
+    entry = _fitted.get(cache_key)
+    if entry is not None:
+        return entry
+
+    with _lock:
+        entry = _fitted.get(cache_key)
+        if entry is not None:
+            return entry
+
+        X = load_dataset(file_path)[list(features)].to_numpy(dtype=float)
+        store_config = {'features': list(features), **config}
+        pipeline = load_entry(file_path, version, store_config, ('preprocess',))
+        if pipeline is None:
+            pipeline = build_pipeline(features, config).fit(X)
+            save_entry(file_path, version, store_config, ('preprocess',), pipeline)
+
+        matrix = np.ascontiguousarray(pipeline.transform(X), dtype=float)
+        matrix.setflags(write=False)
+
+        for stale in [stale for stale in _fitted if stale[0] == cache_key[0] and stale[1] != version]:
+            del _fitted[stale]
+        entry = _fitted[cache_key] = {'pipeline': pipeline, 'matrix': matrix}
+        return entry
@@ -0,0 +1,185 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from longsor_cluster.distance import MAX_CACHE_MB, precomputed_silhouette
+
+# Anggaran waktu (detik) untuk satu skor silhouette; menentukan mode dan ukuran sampel
+LATENCY_BUDGET = float(os.environ.get('LONGSOR_SILHOUETTE_BUDGET_S', 2.0))
+
+# Perkiraan jumlah pasangan jarak yang dihitung per detik (silhouette eksak O(n^2))
+PAIRS_PER_SECOND = float(os.environ.get('LONGSOR_SILHOUETTE_PAIRS_PER_S', 5e7))
+
+# Batas memori kerja (MB) untuk blok jarak saat menghitung silhouette sampel
+WORKING_MEMORY_MB = int(os.environ.get('LONGSOR_SILHOUETTE_WORKING_MB', 64))
+
+# Batas memori (MB) blok jarak silhouette eksak (total semua worker) dan jumlah worker-nya
+EXACT_MEMORY_MB = float(os.environ.get('LONGSOR_SILHOUETTE_MEMORY_MB', 512))
+EXACT_WORKERS = int(os.environ.get('LONGSOR_SILHOUETTE_WORKERS', os.cpu_count() or 1))
+
+# Mulai jumlah baris ini KMeans memakai silhouette berbasis centroid (semua titik, O(n*k));
+# di bawahnya sampel terstratifikasi lebih dekat ke skor eksak
+CENTROID_MIN_ROWS = int(os.environ.get('LONGSOR_SILHOUETTE_CENTROID_ROWS', 1_000_000))
+
+# Jumlah resample bootstrap dan tingkat kepercayaan interval
+BOOTSTRAPS = 200
+CONFIDENCE = 0.95
+
+# Mode penghitungan silhouette: eksak, sampel terstratifikasi, atau berbasis centroid
+SILHOUETTE_MODES = ['exact', 'sample', 'centroid']
+
+# Kolom hasil silhouette_estimate yang disimpan di tabel metrik
+SILHOUETTE_COLUMNS = ['silhouette_score', 'ci_low', 'ci_high', 'silhouette_mode', 'scored_points']
+
+
+# Function to get the percentile bootstrap interval of the mean of per-point silhouette values
+def _bootstrap_ci(values, rng, n_boot=BOOTSTRAPS, confidence=CONFIDENCE, max_points=100_000):
+    if len(values) > max_points:
+        values = rng.choice(values, size=max_points, replace=False)
+    means = np.array([rng.choice(values, size=len(values)).mean() for _ in range(n_boot)])
+    alpha = (1 - confidence) / 2
+    return float(np.quantile(means, alpha)), float(np.quantile(means, 1 - alpha))
+
+
+# Function to draw a sample stratified by cluster (proportional, at least 2 points per cluster)
+def stratified_sample(labels, size, rng):
+    clusters, counts = np.unique(labels, return_counts=True)
+    quota = np.maximum(np.round(counts * size / len(labels)).astype(int), 2)
+    index = [
+        rng.choice(np.flatnonzero(labels == cluster), size=min(q, count), replace=False)
+        for cluster, count, q in zip(clusters, counts, quota)
+    ]
+    return np.sort(np.concatenate(index))
+
+
+# Function to compute the simplified (centroid-based) silhouette of every point, O(n*k)
+def simplified_silhouette_samples(X, labels, centroids):
+    from scipy.spatial.distance import cdist
+
+    distances = cdist(X, centroids)
+    own = distances[np.arange(len(X)), labels]
+    distances[np.arange(len(X)), labels] = np.inf
+    nearest = distances.min(axis=1)
+    denominator = np.maximum(own, nearest)
+    return np.divide(nearest - own, denominator, out=np.zeros_like(own), where=denominator > 0)
+
+
+# Function to compute the silhouette of every point for one block of rows and every labelling:
+# one distance block, then the per-cluster distance sums of all labellings in one product
+def _silhouette_block(X, start, stop, onehot, offsets, counts, labelings, metric):
+    from scipy.spatial.distance import cdist
+
+    sums = cdist(X[start:stop], X, metric=metric) @ onehot
+    rows = np.arange(stop - start)
+    values = np.empty((len(labelings), stop - start))
+    for i, labels in enumerate(labelings):
+        block = sums[:, offsets[i]:offsets[i + 1]]
+        size = counts[i]
+        own = labels[start:stop]
+        a = block[rows, own] / np.maximum(size[own] - 1, 1)
+        mean_other = block / size
+        mean_other[rows, own] = np.inf
+        b = mean_other.min(axis=1)
+        denominator = np.maximum(a, b)
+        values[i] = np.divide(b - a, denominator, out=np.zeros(len(rows)), where=(denominator > 0) & (size[own] > 1))
+    return values
+
+
+# Function to compute exact per-point silhouette values for several labellings (e.g. every k of
+# a sweep) in one pass over the distance blocks. Rows are processed in blocks that fit the memory
+# ceiling across all workers, so memory stays O(block * n) instead of O(n^2).
+# Returns an array of shape (len(labelings), n); singletons get 0 like sklearn.
+def silhouette_samples_sweep(features, labelings, metric='euclidean', memory_mb=EXACT_MEMORY_MB, workers=EXACT_WORKERS):
+    X = np.ascontiguousarray(features, dtype=float)
+    n = len(X)
+    labelings = [np.unique(labels, return_inverse=True)[1] for labels in labelings]
+    counts = [np.bincount(labels).astype(float) for labels in labelings]
+    offsets = np.concatenate([[0], np.cumsum([len(size) for size in counts])])
+
+    # One-hot membership of every labelling side by side: n x (k_1 + k_2 + ...)
+    onehot = np.zeros((n, offsets[-1]))
+    for i, labels in enumerate(labelings):
+        onehot[np.arange(n), offsets[i] + labels] = 1.0
+
+    workers = max(1, workers)
+    block_rows = max(1, int(memory_mb * 2**20 / (8 * (n + offsets[-1]) * workers)))
+    bounds = [(start, min(start + block_rows, n)) for start in range(0, n, block_rows)]
+    values = np.empty((len(labelings), n))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        blocks = pool.map(lambda bound: _silhouette_block(X, *bound, onehot, offsets, counts, labelings, metric), bounds)
+        for (start, stop), block in zip(bounds, blocks):
+            values[:, start:stop] = block
+    return values
+
+
+# Function to compute exact silhouette scores for several labellings in one blocked pass;
+# NaN for labellings with a single cluster or one cluster per point
+def exact_silhouette_scores(features, labelings, metric='euclidean', memory_mb=EXACT_MEMORY_MB, workers=EXACT_WORKERS):
+    labelings = [np.asarray(labels) for labels in labelings]
+    valid = [i for i, labels in enumerate(labelings) if 2 <= len(np.unique(labels)) < len(labels)]
+    scores = np.full(len(labelings), np.nan)
+    if valid:
+        values = silhouette_samples_sweep(features, [labelings[i] for i in valid], metric, memory_mb, workers)
+        scores[valid] = values.mean(axis=1)
+    return scores
+
+
+# Function to pick the silhouette mode for n points within the latency budget
+def choose_mode(n, has_centroids=False, budget=LATENCY_BUDGET):
+    if n * n / PAIRS_PER_SECOND <= budget:
+        return 'exact'
+    if has_centroids and n >= CENTROID_MIN_ROWS:
+        return 'centroid'
+    return 'sample'
+
+
+# Function to estimate the silhouette score of a clustering with a confidence interval.
+# mode='auto' uses the exact score when it fits the latency budget, otherwise a stratified
+# sample sized to the budget, or the centroid (simplified) silhouette for very large KMeans runs.
+# Returns the score, its interval, the mode used and the points scored.
+def silhouette_estimate(features, labels, mode='auto', centroids=None, budget=LATENCY_BUDGET, random_state=42):
+    from sklearn import config_context
+    from sklearn.metrics import silhouette_samples
+
+    X = np.ascontiguousarray(features, dtype=float)
+    labels = np.asarray(labels)
+    if mode == 'auto':
+        mode = choose_mode(len(X), centroids is not None, budget)
+
+    n_labels = len(np.unique(labels))
+    if n_labels < 2 or n_labels >= len(labels):
+        return {'silhouette_score': np.nan, 'ci_low': np.nan, 'ci_high': np.nan, 'silhouette_mode': mode, 'scored_points': len(X)}
+
+    rng = np.random.default_rng(random_state)
+    if mode == 'exact':
+        # Small data shares the cached distance matrix; larger data uses the blocked kernel
+        if 1.5 * 8 * len(X) ** 2 <= MAX_CACHE_MB * 2**20:
+            score = precomputed_silhouette(X, labels)
+        else:
+            score = float(exact_silhouette_scores(X, [labels])[0])
+        ci_low = ci_high = score
+        scored = len(X)
+    elif mode == 'centroid':
+        values = simplified_silhouette_samples(X, labels, np.asarray(centroids, dtype=float))
+        score = float(values.mean())
+        ci_low, ci_high = _bootstrap_ci(values, rng)
+        scored = len(X)
+    else:
+        size = int(min(len(X), max(500, np.sqrt(budget * PAIRS_PER_SECOND))))
+        index = stratified_sample(labels, size, rng)
+        with config_context(working_memory=WORKING_MEMORY_MB):
+            values = silhouette_samples(X[index], labels[index])
+        score = float(values.mean())
+        ci_low, ci_high = _bootstrap_ci(values, rng)
+        scored = len(index)
+
+    return {'silhouette_score': score, 'ci_low': ci_low, 'ci_high': ci_high, 'silhouette_mode': mode, 'scored_points': scored}
+
+
+# Function to describe one silhouette estimate for the dashboard, e.g. "0.612 (95% CI 0.598–0.627, sample of 2000 points)"
+def describe_silhouette(result):
+    if result['silhouette_mode'] == 'exact' or np.isnan(result['silhouette_score']):
+        return f"{result['silhouette_score']:.3f} (exact)"
+    source = 'centroid-based' if result['silhouette_mode'] == 'centroid' else f"sample of {int(result['scored_points'])} points"
+    return f"{result['silhouette_score']:.3f} ({CONFIDENCE:.0%} CI {result['ci_low']:.3f}–{result['ci_high']:.3f}, {source})"
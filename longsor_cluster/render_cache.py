@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Batas memori cache HTML peta (MB), peta yang paling lama tidak dipakai dibuang lebih dulu
+MAX_CACHE_MB = float(os.environ.get('LONGSOR_MAP_CACHE_MB', 64))
+
+# Lapisan standar peta dashboard, bagian dari kunci cache
+DEFAULT_LAYERS = ('markers', 'heatmap', 'draw', 'google')
+
+# Jumlah maksimum peta dasar (objek folium) untuk mode peta interaktif
+MAX_BASE_MAPS = int(os.environ.get('LONGSOR_BASE_MAP_ENTRIES', 16))
+
+_cache = OrderedDict()
+_base_maps = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+# Function to hash cluster labels so a map is only rebuilt when the assignment changes
+def labels_hash(labels):
+    values = np.ascontiguousarray(labels, dtype=np.int64)
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+# Function to build the cache key of a rendered map
+def map_key(dataset_version, year=None, kabupaten=None, labels=None, layers=DEFAULT_LAYERS):
+    return (dataset_version, year, kabupaten, labels_hash(labels) if labels is not None else None, tuple(layers))
+
+
+# Function to render a folium map to HTML the same way folium_static does
+def render_html(m):
+    import folium
+
+    return folium.Figure().add_child(m).render()
+
+
+# Function to return the rendered HTML for a key, building and rendering the map only on a miss
+def cached_map_html(key, build_map):
+    global _cache_bytes
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            return entry[0]
+
+    html = render_html(build_map())
+    size = len(html.encode())
+    with _lock:
+        if key not in _cache and size <= MAX_CACHE_MB * 2**20:
+            _cache[key] = (html, size)
+            _cache_bytes += size
+            while _cache_bytes > MAX_CACHE_MB * 2**20:
+                _, (_, evicted_size) = _cache.popitem(last=False)
+                _cache_bytes -= evicted_size
+    return html
+
+
+# Function to return the cached folium map object for a key (interactive mode), building it only on a miss
+def cached_map(key, build_map):
+    with _lock:
+        m = _base_maps.get(key)
+        if m is not None:
+            _base_maps.move_to_end(key)
+            return m
+
+    m = build_map()
+    with _lock:
+        m = _base_maps.setdefault(key, m)
+        while len(_base_maps) > MAX_BASE_MAPS:
+            _base_maps.popitem(last=False)
+    return m
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+# Ambang batas kategori tingkat rawan berdasarkan JUMLAH_LONGSOR
+THRESHOLD_LOW = 10
+THRESHOLD_HIGH = 101
+
+RISK_CATEGORIES = ['Tingkat Rawan Rendah', 'Tingkat Rawan Sedang', 'Tingkat Rawan Tinggi']
+
+
+# Function to map landslide counts to a risk category (vectorized)
+def risk_category(values, threshold_low=THRESHOLD_LOW, threshold_high=THRESHOLD_HIGH):
+    values = np.asarray(values, dtype=float)
+    return np.select([values < threshold_low, values < threshold_high], RISK_CATEGORIES[:2], RISK_CATEGORIES[2])
+
+
+# Function to categorize every row by the mean JUMLAH_LONGSOR of its cluster (KMeans page)
+def categorize_clusters(data, cluster_column='cluster'):
+    cluster_mean = data.groupby(cluster_column)['JUMLAH_LONGSOR'].transform('mean')
+    return pd.Series(risk_category(cluster_mean), index=data.index)
+
+
+# Function to categorize every row by its own JUMLAH_LONGSOR (AHC page)
+def categorize_rows(data):
+    return pd.Series(risk_category(data['JUMLAH_LONGSOR']), index=data.index)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Tabel kode KABUPATEN yang sama untuk semua dataset (27 kabupaten/kota di Provinsi Jawa Barat).
+# Nama baru ditambahkan di belakang (urut abjad), jadi kode yang sudah ada tidak berubah.
+KABUPATEN_CODES = [
+    'KABUPATEN BANDUNG', 'KABUPATEN BANDUNG BARAT', 'KABUPATEN BEKASI', 'KABUPATEN BOGOR',
+    'KABUPATEN CIAMIS', 'KABUPATEN CIANJUR', 'KABUPATEN CIREBON', 'KABUPATEN GARUT',
+    'KABUPATEN INDRAMAYU', 'KABUPATEN KARAWANG', 'KABUPATEN KUNINGAN', 'KABUPATEN MAJALENGKA',
+    'KABUPATEN PANGANDARAN', 'KABUPATEN PURWAKARTA', 'KABUPATEN SUBANG', 'KABUPATEN SUKABUMI',
+    'KABUPATEN SUMEDANG', 'KABUPATEN TASIKMALAYA', 'KOTA BANDUNG', 'KOTA BANJAR', 'KOTA BEKASI',
+    'KOTA BOGOR', 'KOTA CIMAHI', 'KOTA CIREBON', 'KOTA DEPOK', 'KOTA SUKABUMI', 'KOTA TASIKMALAYA',
+]
+
+# Kolom koordinat, disimpan sebagai float32 (presisi ~1 m)
+COORDINATE_COLUMNS = ['LATITUDE', 'LONGITUDE']
+
+# Tipe integer dari yang terkecil, untuk downcast kolom jumlah
+INTEGER_TYPES = ['int8', 'int16', 'int32', 'int64']
+
+
+# Function to list the columns without data: no header ("Unnamed: N") or only empty/blank values
+def empty_columns(df):
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            values = values.str.strip().replace('', np.nan)
+        if str(column).startswith('Unnamed:') or values.isna().all():
+            columns.append(column)
+    return columns
+
+
+# Function to get the KABUPATEN categories: the shared code table, then unknown names
+def kabupaten_categories(values):
+    extra = sorted(set(values.dropna()) - set(KABUPATEN_CODES))
+    return KABUPATEN_CODES + extra
+
+
+# Function to downcast an integer column to the smallest type that holds twice its largest
+# magnitude, so a difference or sum of two values cannot wrap around
+def _downcast_integer(values):
+    limit = 2 * int(values.abs().max()) if len(values) else 0
+    for dtype in INTEGER_TYPES:
+        if limit <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values
+
+
+# Function to apply the compact schema to a raw table: drop empty columns, KABUPATEN as a
+# categorical over the shared code table, counts downcast and coordinates as float32.
+# Returns the typed frame and a report with the memory before/after and the dropped columns.
+def apply_schema(df):
+    bytes_before = int(df.memory_usage(deep=True).sum())
+    dropped = empty_columns(df)
+    df = df.drop(columns=dropped)
+
+    if 'KABUPATEN' in df.columns:
+        df['KABUPATEN'] = pd.Categorical(df['KABUPATEN'], categories=kabupaten_categories(df['KABUPATEN']))
+    for column in df.columns:
+        if column in COORDINATE_COLUMNS:
+            df[column] = df[column].astype('float32')
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = _downcast_integer(df[column])
+
+    bytes_after = int(df.memory_usage(deep=True).sum())
+    report = {
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'saved_ratio': 1 - bytes_after / bytes_before if bytes_before else 0.0,
+        'dropped_columns': [str(column) for column in dropped],
+    }
+    return df, report
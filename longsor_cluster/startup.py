@@ -0,0 +1,89 @@
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Modul berat yang dicatat bila sudah ter-import (oleh halaman atau job precompute di latar
+# belakang) saat halaman pertama kali selesai digambar
+HEAVY_MODULES = ['sklearn', 'scipy', 'folium', 'plotly', 'matplotlib', 'seaborn', 'streamlit_extras', 'altair', 'joblib']
+
+# Batas waktu satu run halaman (detik) dan jumlah paket dengan waktu import terbesar yang dilaporkan
+PAGE_TIMEOUT = 600
+TOP_IMPORTS = 8
+
+# Script run in a fresh interpreter: load streamlit's app test harness, run the page twice
+# (first visit, then a rerun) and print one JSON line with the timings and loaded modules.
+# The interpreter start is measured with wall-clock time: perf_counter values of two processes
+# cannot be compared.
+_PROBE = '''
+import json, os, sys, time
+started = time.time()
+ready = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness_s = time.perf_counter() - ready
+page, launched, timeout, heavy = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), sys.argv[4].split(',')
+app = AppTest.from_file(page, default_timeout=timeout)
+start = time.perf_counter()
+app.run()
+first_run_s = time.perf_counter() - start
+modules = [name for name in heavy if name in sys.modules]
+start = time.perf_counter()
+app.run()
+rerun_s = time.perf_counter() - start
+print(json.dumps({
+    'interpreter_s': started - launched,
+    'harness_s': harness_s,
+    'first_run_s': first_run_s,
+    'rerun_s': rerun_s,
+    'modules': modules,
+    'exceptions': [str(e.value)[:200] for e in app.exception],
+}), flush=True)
+os._exit(0)
+'''
+
+
+# Function to list the pages of the app: the home page in the app folder and pages/*.py
+def app_pages(app_dir='.'):
+    home = sorted(glob.glob(os.path.join(app_dir, '*HomePage.py')))
+    return home + sorted(glob.glob(os.path.join(app_dir, 'pages', '*.py')))
+
+
+# Function to sum the -X importtime report per top-level package (cumulative ms of the
+# outermost import of each package), largest first
+def _import_times(stderr):
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit() or name.startswith('  '):
+            continue
+        package = name.strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(cumulative) / 1000
+    return dict(sorted(totals.items(), key=lambda item: -item[1])[:TOP_IMPORTS])
+
+
+# Function to profile the cold start of one page in a fresh interpreter (as a new Streamlit
+# worker process after a deploy). Returns the timings in seconds: interpreter start, the
+# streamlit test harness, the first run (page imports and first paint) and a rerun, plus the
+# heavy modules loaded by the first run and the slowest top-level imports.
+def profile_page(page, app_dir='.', timeout=PAGE_TIMEOUT):
+    launched = time.time()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE, os.path.abspath(page), repr(launched), str(timeout), ','.join(HEAVY_MODULES)],
+        cwd=app_dir, capture_output=True, text=True, timeout=timeout * 2,
+    )
+    lines = [line for line in process.stdout.splitlines() if line.startswith('{')]
+    if process.returncode != 0 or not lines:
+        return {'page': os.path.basename(page), 'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f'exit status {process.returncode}'}
+
+    result = json.loads(lines[-1])
+    result['cold_start_s'] = result['interpreter_s'] + result['harness_s'] + result['first_run_s']
+    return {'page': os.path.basename(page), **result, 'imports_ms': _import_times(process.stderr)}
+
+
+# Function to profile every page, one fresh interpreter each
+def profile_startup(pages=None, app_dir='.', timeout=PAGE_TIMEOUT):
+    return [profile_page(page, app_dir, timeout) for page in pages or app_pages(app_dir)]
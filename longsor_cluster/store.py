@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from importlib.metadata import version as package_version
+
+from longsor_cluster.data import CACHE_DIR
+
+# Folder model store: hasil fit (centroid, linkage, label, scaler, tabel metrik) yang bertahan
+# setelah proses di-restart; satu subfolder per dataset, versi dataset dan konfigurasi
+STORE_DIR = os.environ.get('LONGSOR_MODEL_DIR', os.path.join(CACHE_DIR, 'models'))
+
+# Versi format store, dinaikkan jika isi/format entri berubah
+STORE_FORMAT = 1
+
+
+# Function to get a short key of a configuration (any JSON-serialisable dict)
+def config_key(config):
+    text = json.dumps(config, sort_keys=True)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+# Function to get the version metadata an entry folder must match to be reused, read from the
+# installed package metadata so listing the store does not import scikit-learn
+def _libraries():
+    return {'numpy': package_version('numpy'), 'pandas': package_version('pandas'), 'sklearn': package_version('scikit-learn')}
+
+
+# Function to get the store folder of a dataset (one subfolder per dataset version)
+def _dataset_dir(file_path, root):
+    name = re.sub(r'[^A-Za-z0-9]+', '-', os.path.splitext(os.path.basename(file_path))[0]).strip('-').lower()
+    return os.path.join(root, name)
+
+
+# Function to get the entry folder of a dataset version and configuration
+def entry_dir(file_path, version, config, root=STORE_DIR):
+    return os.path.join(_dataset_dir(file_path, root), version[:16], config_key(config))
+
+
+# Function to turn an entry key such as ('ahc', 'single', 3) into a file name and back
+def _entry_file(key):
+    return '-'.join(str(part) for part in key) + '.joblib'
+
+
+# Function to get the entry key of a file name written by _entry_file
+def _entry_key(name):
+    return tuple(int(part) if part.isdigit() else part for part in name[:-len('.joblib')].split('-'))
+
+
+# Function to read the metadata of an entry folder, None when it is missing or was written
+# by another store format or library version
+def _read_meta(path):
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta.get('format') != STORE_FORMAT or meta.get('libraries') != _libraries():
+        return None
+    return meta
+
+
+# Function to write the metadata of a new entry folder, and drop the folders of older
+# versions of the same dataset so the store only grows with the configurations in use
+def _write_meta(path, file_path, version, config, root):
+    meta = {
+        'format': STORE_FORMAT,
+        'dataset': os.path.basename(file_path),
+        'dataset_version': version,
+        'config': config,
+        'libraries': _libraries(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+    os.makedirs(path, exist_ok=True)
+    # Unique temp file per call: precompute threads may write the first entries of a folder at once
+    with tempfile.NamedTemporaryFile('w', dir=path, prefix='meta.json.', suffix='.tmp', delete=False) as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f.name, os.path.join(path, 'meta.json'))
+    prune_versions(file_path, version, root)
+
+
+# Function to save one fitted result (any picklable value) under a dataset version and configuration
+def save_entry(file_path, version, config, key, value, root=STORE_DIR):
+    import joblib
+
+    path = entry_dir(file_path, version, config, root)
+    if _read_meta(path) is None:
+        _write_meta(path, file_path, version, config, root)
+    entry_path = os.path.join(path, _entry_file(key))
+    with tempfile.NamedTemporaryFile(dir=path, prefix=f'{_entry_file(key)}.', suffix='.tmp', delete=False) as f:
+        joblib.dump(value, f)
+    os.replace(f.name, entry_path)
+
+
+# Function to list the stored entries of a dataset version and configuration without loading
+# them. Returns the entry file by key (empty when nothing usable is stored).
+def stored_entries(file_path, version, config, root=STORE_DIR):
+    path = entry_dir(file_path, version, config, root)
+    if _read_meta(path) is None:
+        return {}
+    return {_entry_key(name): os.path.join(path, name) for name in os.listdir(path) if name.endswith('.joblib')}
+
+
+# Function to load one entry, None when it is not stored
+def load_entry(file_path, version, config, key, root=STORE_DIR):
+    import joblib
+
+    entry_path = stored_entries(file_path, version, config, root).get(key)
+    return None if entry_path is None else joblib.load(entry_path)
+
+
+# Function to get the size of a folder in bytes
+def _folder_bytes(path):
+    return sum(os.path.getsize(os.path.join(folder, name)) for folder, _, names in os.walk(path) for name in names)
+
+
+# Function to drop the stored versions of a dataset other than the given one
+def prune_versions(file_path, version, root=STORE_DIR):
+    removed = []
+    dataset_dir = _dataset_dir(file_path, root)
+    if os.path.isdir(dataset_dir):
+        for name in os.listdir(dataset_dir):
+            if name != version[:16]:
+                shutil.rmtree(os.path.join(dataset_dir, name), ignore_errors=True)
+                removed.append(os.path.join(dataset_dir, name))
+    return removed
+
+
+# Function to prune the store: drop the stale versions of the given datasets, the folders that
+# can no longer be read (other store format or library versions), and then the least recently
+# written configurations until the store fits max_mb. Returns the removed folders.
+def prune(versions, max_mb=None, root=STORE_DIR):
+    removed = []
+    for file_path, version in versions.items():
+        removed += prune_versions(file_path, version, root)
+
+    folders = []
+    for dataset in os.listdir(root) if os.path.isdir(root) else []:
+        for version in os.listdir(os.path.join(root, dataset)):
+            for config in os.listdir(os.path.join(root, dataset, version)):
+                path = os.path.join(root, dataset, version, config)
+                if _read_meta(path) is None:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path)
+                else:
+                    folders.append((max(os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)), path))
+
+    if max_mb is not None:
+        sizes = {path: _folder_bytes(path) for _, path in folders}
+        total = sum(sizes.values())
+        for _, path in sorted(folders):
+            if total <= max_mb * 2**20:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+            total -= sizes[path]
+    return removed
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from longsor_cluster.data import CLUSTER_FEATURES
+
+# Jumlah baris yang dibaca per potongan (chunk); memori dibatasi oleh nilai ini, bukan ukuran file
+CHUNK_ROWS = int(os.environ.get('LONGSOR_STREAM_CHUNK_ROWS', 100_000))
+
+
+# Function to read only the feature columns of a CSV, chunk by chunk
+def _chunks(csv_path, features, chunksize, usecols=True):
+    return pd.read_csv(csv_path, usecols=features if usecols else None, chunksize=chunksize)
+
+
+# Function to scale one chunk; missing values become 0 after scaling, i.e. the streamed mean
+def _transform(scaler, chunk, features):
+    X = scaler.transform(chunk[features].to_numpy(dtype=float))
+    return np.nan_to_num(X, nan=0.0)
+
+
+# Pass 1: running mean and variance of every feature (NaN are ignored, as in fillna(mean))
+def feature_stats(csv_path, features=CLUSTER_FEATURES, chunksize=CHUNK_ROWS):
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    rows = 0
+    for chunk in _chunks(csv_path, features, chunksize):
+        if len(chunk):
+            scaler.partial_fit(chunk[features].to_numpy(dtype=float))
+            rows += len(chunk)
+    if rows == 0:
+        raise ValueError(f'{csv_path} has no rows to cluster')
+    return scaler
+
+
+# Pass 2: update MiniBatchKMeans with partial_fit on every scaled chunk (optionally several epochs).
+# The first partial_fit initializes the k centroids, so chunks are buffered until it gets at least
+# batch_size rows (or the whole file when it is smaller); a file with fewer than k rows is an error.
+def stream_fit(csv_path, k, scaler, features=CLUSTER_FEATURES, chunksize=CHUNK_ROWS, epochs=1, batch_size=4096, random_state=42):
+    from sklearn.cluster import MiniBatchKMeans
+
+    model = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=random_state, n_init=3)
+    buffer, buffered = [], 0
+    for _ in range(epochs):
+        for chunk in _chunks(csv_path, features, chunksize):
+            if not len(chunk):
+                continue
+            X = _transform(scaler, chunk, features)
+            if hasattr(model, 'cluster_centers_'):
+                model.partial_fit(X)
+                continue
+            buffer.append(X)
+            buffered += len(X)
+            if buffered >= max(k, batch_size):
+                model.partial_fit(np.vstack(buffer))
+                buffer, buffered = [], 0
+        if buffer:
+            if buffered < k:
+                raise ValueError(f'{csv_path} has {buffered} rows, fewer than the {k} clusters asked for')
+            model.partial_fit(np.vstack(buffer))
+            buffer, buffered = [], 0
+    return model
+
+
+# Pass 3: assign labels chunk by chunk and append them, with the original columns, to out_path.
+# Returns the number of rows per cluster and the total inertia in scaled units.
+def stream_labels(csv_path, out_path, scaler, model, features=CLUSTER_FEATURES, chunksize=CHUNK_ROWS):
+    counts = np.zeros(model.n_clusters, dtype=np.int64)
+    inertia = 0.0
+    tmp_path = f'{out_path}.{os.getpid()}.tmp'
+    for i, chunk in enumerate(_chunks(csv_path, features, chunksize, usecols=False)):
+        X = _transform(scaler, chunk, features)
+        labels = model.predict(X)
+        counts += np.bincount(labels, minlength=model.n_clusters)
+        inertia += float(((X - model.cluster_centers_[labels]) ** 2).sum())
+        chunk['cluster'] = labels
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, out_path)
+    return counts, inertia
+
+
+# Function to cluster an event-level CSV of any size with bounded memory: a statistics pass,
+# a MiniBatchKMeans fit pass and a labelling pass that writes <name>_stream_labels.csv and
+# the centroids (in original units) to out. Returns the paths and a summary.
+def run_stream(csv_path, k, out, features=CLUSTER_FEATURES, chunksize=CHUNK_ROWS, epochs=1, random_state=42):
+    os.makedirs(out, exist_ok=True)
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+
+    scaler = feature_stats(csv_path, features, chunksize)
+    model = stream_fit(csv_path, k, scaler, features, chunksize, epochs, random_state=random_state)
+
+    labels_path = os.path.join(out, f'{name}_stream_labels.csv')
+    counts, inertia = stream_labels(csv_path, labels_path, scaler, model, features, chunksize)
+
+    centroids = pd.DataFrame(scaler.inverse_transform(model.cluster_centers_), columns=features)
+    centroids.insert(0, 'count', counts)
+    centroids.insert(0, 'cluster', range(k))
+    centroids_path = os.path.join(out, f'{name}_stream_centroids.csv')
+    centroids.to_csv(centroids_path, index=False)
+
+    summary = {'rows': int(counts.sum()), 'num_clusters': k, 'inertia': inertia, 'epochs': epochs}
+    return labels_path, centroids_path, summary
@@ -0,0 +1,210 @@
+import argparse
+import contextlib
+import math
+import os
+import sqlite3
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lapisan tile Google yang dipakai peta dashboard: nama -> (URL upstream, atribusi)
+TILE_LAYERS = {
+    'satellite': ('https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}', 'Google Digital Satellite'),
+    'labels': ('https://mt1.google.com/vt/lyrs=h&x={x}&y={y}&z={z}', 'Google Labels'),
+}
+
+# Batas wilayah Provinsi Jawa Barat (min_lon, min_lat, max_lon, max_lat) untuk prefetch
+WEST_JAVA_BBOX = (106.35, -7.85, 108.85, -5.90)
+
+# Folder cache tile di disk dan folder file MBTiles (<layer>.mbtiles), opsional
+TILE_CACHE_DIR = os.environ.get('LONGSOR_TILE_DIR', '.tile_cache')
+MBTILES_DIR = os.environ.get('LONGSOR_MBTILES_DIR')
+
+# LONGSOR_TILE_PROXY_URL: alamat proxy tile yang bisa dijangkau browser (mis. http://server:8765).
+# LONGSOR_TILE_PROXY=local: jalankan proxy di proses Streamlit dan pakai http://localhost:<port>.
+TILE_PROXY_URL = os.environ.get('LONGSOR_TILE_PROXY_URL')
+TILE_PROXY = os.environ.get('LONGSOR_TILE_PROXY')
+TILE_PROXY_PORT = int(os.environ.get('LONGSOR_TILE_PROXY_PORT', 8765))
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Function to read one tile from <layer>.mbtiles (MBTiles stores rows in TMS order)
+def _read_mbtiles(layer, z, x, y):
+    if not MBTILES_DIR:
+        return None
+    path = os.path.join(MBTILES_DIR, f'{layer}.mbtiles')
+    if not os.path.exists(path):
+        return None
+    with contextlib.closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as conn:
+        row = conn.execute(
+            'SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+            (z, x, (1 << z) - 1 - y),
+        ).fetchone()
+    return row[0] if row else None
+
+
+# Function to get the on-disk cache path of a tile
+def _cache_path(layer, z, x, y):
+    return os.path.join(TILE_CACHE_DIR, layer, str(z), str(x), f'{y}.tile')
+
+
+# Function to download a tile from the upstream server
+def _fetch_upstream(layer, z, x, y):
+    url = TILE_LAYERS[layer][0].format(x=x, y=y, z=z)
+    request = urllib.request.Request(url, headers={'User-Agent': 'longsor-tile-proxy'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read()
+
+
+# Function to get a tile: MBTiles first, then the disk cache, then upstream (stored in the cache).
+# Returns None when the tile is not available (offline, or upstream failed).
+def get_tile(layer, z, x, y, offline=False):
+    data = _read_mbtiles(layer, z, x, y)
+    if data is not None:
+        return data
+
+    path = _cache_path(layer, z, x, y)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    if offline:
+        return None
+    try:
+        data = _fetch_upstream(layer, z, x, y)
+    except OSError:
+        return None
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return data
+
+
+# Function to guess the image type of a tile from its first bytes
+def _content_type(data):
+    if data.startswith(b'\x89PNG'):
+        return 'image/png'
+    if data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    return 'application/octet-stream'
+
+
+# HTTP handler for /tiles/<layer>/<z>/<x>/<y>.png
+class TileHandler(BaseHTTPRequestHandler):
+    offline = False
+
+    def do_GET(self):
+        parts = self.path.split('?')[0].strip('/').split('/')
+        try:
+            prefix, layer, z, x, y = parts
+            z, x, y = int(z), int(x), int(y.split('.')[0])
+        except ValueError:
+            self.send_error(404)
+            return
+        if prefix != 'tiles' or layer not in TILE_LAYERS:
+            self.send_error(404)
+            return
+
+        data = get_tile(layer, z, x, y, offline=self.offline)
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', _content_type(data))
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'public, max-age=604800')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Function to start the tile proxy once per process in a background thread
+def start_tile_proxy(host='0.0.0.0', port=TILE_PROXY_PORT, offline=False):
+    global _server
+    with _server_lock:
+        if _server is None:
+            handler = type('ConfiguredTileHandler', (TileHandler,), {'offline': offline})
+            _server = ThreadingHTTPServer((host, port), handler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+# Function to get the tile URL template of a layer for folium.TileLayer
+def tile_url(layer):
+    if TILE_PROXY_URL:
+        return f"{TILE_PROXY_URL.rstrip('/')}/tiles/{layer}/{{z}}/{{x}}/{{y}}.png"
+    if TILE_PROXY == 'local':
+        start_tile_proxy()
+        return f'http://localhost:{TILE_PROXY_PORT}/tiles/{layer}/{{z}}/{{x}}/{{y}}.png'
+    return TILE_LAYERS[layer][0]
+
+
+# Function to convert a longitude/latitude to tile x/y at zoom z (Web Mercator)
+def lonlat_to_tile(lon, lat, z):
+    n = 1 << z
+    x = int((lon + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+# Function to list every tile of a bounding box for the given zoom levels
+def tiles_in_bbox(bbox, zooms):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    for z in zooms:
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, z)
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, z)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield z, x, y
+
+
+# Function to pre-seed the disk cache for a bounding box; returns (tiles requested, tiles missing)
+def prefetch(layers=tuple(TILE_LAYERS), bbox=WEST_JAVA_BBOX, zooms=range(8, 13), workers=8):
+    jobs = [(layer, z, x, y) for layer in layers for z, x, y in tiles_in_bbox(bbox, zooms)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: get_tile(*job), jobs))
+    return len(jobs), sum(result is None for result in results)
+
+
+# Function to parse a zoom range such as "8..12"
+def _zoom_range(text):
+    start, _, end = text.partition('..')
+    return range(int(start), int(end or start) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m longsor_cluster.tiles', description='Local tile cache/proxy for the dashboard maps')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help='serve cached tiles over HTTP')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=TILE_PROXY_PORT)
+    serve.add_argument('--offline', action='store_true', help='never contact the upstream tile server')
+
+    seed = commands.add_parser('prefetch', help='download the West Java tiles into the disk cache')
+    seed.add_argument('--zoom', type=_zoom_range, default=range(8, 13), help='zoom levels, e.g. 8..12')
+    seed.add_argument('--layers', nargs='+', choices=list(TILE_LAYERS), default=list(TILE_LAYERS))
+    seed.add_argument('--workers', type=int, default=8)
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        handler = type('ConfiguredTileHandler', (TileHandler,), {'offline': args.offline})
+        print(f'Serving tiles from {TILE_CACHE_DIR} on http://{args.host}:{args.port}/tiles/<layer>/<z>/<x>/<y>.png')
+        ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
+    else:
+        total, missing = prefetch(args.layers, zooms=args.zoom, workers=args.workers)
+        print(f'{total - missing}/{total} tiles cached in {TILE_CACHE_DIR}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,15 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-from streamlit_extras.metric_cards import style_metric_cards
-import plotly_express as px
+from longsor_cluster.data import load_dataset, dataset_version, DATASET_JUMLAH
+from longsor_cluster.charts import line_chart, scatter_chart
+from longsor_cluster.lazy import lazy_panel, memoized
+from longsor_cluster.precompute import kmeans_metrics, kmeans_result, start_precompute
+from longsor_cluster.quality import describe_silhouette
 #from query import *
 st.set_option('deprecation.showPyplotGlobalUse', False)
 
-# Load the dataset
-df = pd.read_csv("Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv")
+# Load the dataset (the shared frame, this page does not modify it)
+df = load_dataset(DATASET_JUMLAH)
+version = dataset_version(DATASET_JUMLAH)
 
 #navicon and header
 st.set_page_config(page_title="Dashboard", page_icon="📈", layout="wide")  
@@ -45,74 +44,60 @@ st.markdown(
 
 
 
-# Pilih fitur yang ingin digunakan untuk klasterisasi
-features_kmeans = df[['KABUPATEN', 'JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']]
-
-# Sample DataFrame
-df_sample = df.sample(n=10)  # Ambil sampel 10 desa
+# Every panel below is computed only while it is open; results are memoized per dataset version
 
 # Ekspander untuk menampilkan data
-with st.expander("⬇ DATA UNDERSTANDING FOR KMEANS :"):
+def data_understanding():
     # Display summary statistics
     st.write("Summary statistic adalah ringkasan statistik deskriptif yang mencakup ukuran-ukuran seperti mean, median, mode, range, varians, standar deviasi, serta quartiles, yang memberikan gambaran singkat mengenai distribusi dan tendensi data dalam sebuah dataset.")
     
     st.write("Tujuannya memberikan gambaran singkat dan ringkas tentang karakteristik utama dari suatu dataset, termasuk distribusi dan tendensi data, sehingga memudahkan pemahaman awal tentang pola dan tren dalam data sebelum melakukan analisis yang lebih mendalam.")
 
     st.write("### Summary Statistics:")
-    st.write(df.describe())
+    st.write(memoized((version, 'describe'), df.describe))
+
+lazy_panel("⬇ DATA UNDERSTANDING FOR KMEANS :", data_understanding, 'kmeans_data_understanding')
 
 
 # Choose the column for the line chart
 selected_column = 'JUMLAH_LONGSOR'
 
-# Calculate quartiles
-quartiles = df[selected_column].quantile([0.25, 0.5, 0.75])
+# Function to show one quartile of the column with its line chart
+def quartile_panel(quantile, label, title):
+    # Calculate quartiles
+    quartiles = memoized((version, 'quartiles', selected_column), lambda: df[selected_column].quantile([0.25, 0.5, 0.75]))
+
+    # Display quartile values
+    st.write(f"**Quartile Information for {selected_column}:**")
+    st.write(f"- {label}: {quartiles[quantile]}")
+
+    # Line chart for the percentile (downsampled when the data does not fit the chart payload budget)
+    fig = memoized((version, 'quartile_line', selected_column, title), lambda: line_chart(df, selected_column, version, title=title, height=300, width=400))
+    st.plotly_chart(fig)
 
 # Create columns for expanders
 c1, c2, c3 = st.columns(3)
 
 with c1:
-    with st.expander("⬇ QUARTILE Q1"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 0.25% Percentile (Q1): {quartiles[0.25]}")
-
-        # Line chart for the 25th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 25th Percentile (Q1)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q1", lambda: quartile_panel(0.25, "0.25% Percentile (Q1)", "Line Chart - 25th Percentile (Q1)"), 'kmeans_q1')
 
 with c2:
-    with st.expander("⬇ QUARTILE Q2"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 50th Percentile (Q2): {quartiles[0.5]}")
-
-        # Line chart for the 50th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 50th Percentile (Q2)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q2", lambda: quartile_panel(0.5, "50th Percentile (Q2)", "Line Chart - 50th Percentile (Q2)"), 'kmeans_q2')
 
 with c3:
-    with st.expander("⬇ QUARTILE Q3"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 75th Percentile (Q3): {quartiles[0.75]}")
-
-        # Line chart for the 75th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 75th Percentile (Q3)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q3", lambda: quartile_panel(0.75, "75th Percentile (Q3)", "Line Chart - 75th Percentile (Q3)"), 'kmeans_q3')
 
 # Membuat ekspander untuk menampilkan korelasi
-with st.expander("⬇ EKSPLORASI VARIABEL:"):
+def variable_exploration():
+    import plotly_express as px
+
     st.subheader("Korelasi antara Variabel")
     
     # Ganti df_selection dengan dataframe yang ingin Anda gunakan
     selected_features = ['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT','TERTIMBUN']
     
     # Hitung matriks korelasi
-    correlation_matrix = df[selected_features].corr()
+    correlation_matrix = memoized((version, 'correlation', tuple(selected_features)), lambda: df[selected_features].corr())
 
     # Plot heatmap using Plotly Express
     fig = px.imshow(correlation_matrix,
@@ -127,83 +112,92 @@ with st.expander("⬇ EKSPLORASI VARIABEL:"):
 
     st.write("Visualisasi ini memberikan representasi visual dari data dalam bentuk matriks, di mana intensitas warna pada setiap sel matriks menggambarkan nilai variabel yang bersangkutan, memudahkan identifikasi pola, keterkaitan, atau perbedaan dalam data.")
 
+lazy_panel("⬇ EKSPLORASI VARIABEL:", variable_exploration, 'kmeans_variables')
+
 # checking null value
-with st.expander("⬇ NULL VALUES, TENDENCY & VARIABLE DISPERSION"):
+def null_values():
     a1, a2 = st.columns(2)
     a1.write("Jumlah nilai yang tidak ada (NaN atau None) dalam setiap kolom DataFrame.")
-    a1.dataframe(df.isnull().sum(), use_container_width=True)
+    a1.dataframe(memoized((version, 'null_counts'), lambda: df.isnull().sum()), use_container_width=True)
 
     a2.write("Wawasan tentang tendensi pusat, dispersi, dan distribusi data.")
-    a2.dataframe(df.describe().T, use_container_width=True)
-
-# Pilih kolom numerik untuk klasterisasi KMeans
-kolom_numerik = ['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'LATITUDE', 'LONGITUDE']
-X = df[kolom_numerik]
+    a2.dataframe(memoized((version, 'describe'), df.describe).T, use_container_width=True)
 
-# Isi nilai NaN dengan rata-rata kolom numerik
-X.fillna(X.mean(), inplace=True)
+lazy_panel("⬇ NULL VALUES, TENDENCY & VARIABLE DISPERSION", null_values, 'kmeans_null_values')
 
-# Terapkan klasterisasi KMeans
-kmeans = KMeans(n_clusters=2, random_state=42)
-df['Cluster'] = kmeans.fit_predict(X)
-
-
-# Metode Elbow untuk menentukan jumlah klaster optimal
-distortions = []
-for i in range(1, 11):
-    kmeans = KMeans(n_clusters=i, random_state=42)
-    kmeans.fit(X)
-    distortions.append(kmeans.inertia_)
+# Satu kali sweep k=1..10 di latar belakang (fitur hasil pipeline preprocessing bersama,
+# sama dengan halaman pemetaan) untuk Elbow, Silhouette dan klaster utama; panel menunggu
+# hasilnya hanya saat dibuka
+start_precompute(DATASET_JUMLAH)
 
 # Menghitung Silhouette Score untuk berbagai jumlah klaster
-silhouette_scores = []
-for i in range(2, 11):
-    kmeans = KMeans(n_clusters=i, random_state=42)
-    labels = kmeans.fit_predict(X)
-    silhouette_scores.append(silhouette_score(X, labels))
+def silhouette_metrics():
+    sweep_metrics = kmeans_metrics(DATASET_JUMLAH)
+    return sweep_metrics[sweep_metrics['num_clusters'] >= 2]
 
 c1, c2, c3 = st.columns(3)
 
+# Metode Elbow untuk menentukan jumlah klaster optimal
+def elbow_method():
+    import matplotlib.pyplot as plt
+
+    st.write("Metode Elbow digunakan untuk membantu penentuan jumlah cluster yang optimal, dengan mengidentifikasi titik di mana penurunan inersia menjadi lebih lambat, memberikan panduan dalam memilih jumlah cluster yang sesuai untuk data yang dianalisis")
+    distortions = kmeans_metrics(DATASET_JUMLAH)['inertia'].tolist()
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(range(1, 11), distortions, marker='o')
+    ax.set_title('Metode Elbow untuk Menentukan Jumlah Klaster Optimal')
+    ax.set_xlabel('Jumlah Klaster')
+    ax.set_ylabel('Distorsi')
+    st.pyplot(fig)
+    plt.close(fig)
+
 with c1:
-    with st.expander("⬇ ELBOW METHOD"):
-        st.write("Metode Elbow digunakan untuk membantu penentuan jumlah cluster yang optimal, dengan mengidentifikasi titik di mana penurunan inersia menjadi lebih lambat, memberikan panduan dalam memilih jumlah cluster yang sesuai untuk data yang dianalisis")
-        plt.figure(figsize=(8, 6))
-        plt.plot(range(1, 11), distortions, marker='o')
-        plt.title('Metode Elbow untuk Menentukan Jumlah Klaster Optimal')
-        plt.xlabel('Jumlah Klaster')
-        plt.ylabel('Distorsi')
-        st.pyplot()
+    lazy_panel("⬇ ELBOW METHOD", elbow_method, 'kmeans_elbow')
 
 # Visualisasi Silhouette Score
+def silhouette_score():
+    import matplotlib.pyplot as plt
+
+    st.write("Silhouette Score digunakan untuk mengevaluasi seberapa baik setiap titik data sesuai dengan klaster tempat berada, memberikan pengukuran yang membantu menilai kualitas klasterisasi secara keseluruhan.")
+    metrics = silhouette_metrics()
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.plot(range(2, 11), metrics['silhouette_score'].tolist(), marker='o')
+    # Interval kepercayaan (sama dengan skor bila dihitung eksak)
+    ax.fill_between(range(2, 11), metrics['ci_low'], metrics['ci_high'], alpha=0.2)
+    ax.set_title('Silhouette Score untuk Menentukan Jumlah Klaster Optimal')
+    ax.set_xlabel('Jumlah Klaster')
+    ax.set_ylabel('Silhouette Score')
+    st.pyplot(fig)
+    plt.close(fig)
+
 with c2:
-    with st.expander("⬇ SILHOUETTE SCORE"):
-        st.write("Silhouette Score digunakan untuk mengevaluasi seberapa baik setiap titik data sesuai dengan klaster tempat berada, memberikan pengukuran yang membantu menilai kualitas klasterisasi secara keseluruhan.")
-        
-        plt.figure(figsize=(8, 6))
-        plt.plot(range(2, 11), silhouette_scores, marker='o')
-        plt.title('Silhouette Score untuk Menentukan Jumlah Klaster Optimal')
-        plt.xlabel('Jumlah Klaster')
-        plt.ylabel('Silhouette Score')
-        st.pyplot()
+    lazy_panel("⬇ SILHOUETTE SCORE", silhouette_score, 'kmeans_silhouette')
 
 # Kesimpulan
+def conclusion():
+    st.write("Dari analisis yang melibatkan Elbow Method dan Silhouette Score, dapat di simpulkan::")
+    
+    # Menentukan jumlah klaster optimal dari Elbow Method
+    optimal_clusters = 2  # Ganti dengan hasil analisis Elbow Method
+    st.write(f"Jumlah klaster optimal berdasarkan Elbow Method: {optimal_clusters}")
+    
+    # Menampilkan Silhouette Score tertinggi
+    metrics = silhouette_metrics()
+    best_silhouette_score = metrics['silhouette_score'].max()
+    st.write(f"Silhouette Score tertinggi: {best_silhouette_score}")
+    st.caption(describe_silhouette(metrics.loc[metrics['silhouette_score'].idxmax()]))
+
 with c3:
-    with st.expander("⬇ KESIMPULAN"):
-        st.write("Dari analisis yang melibatkan Elbow Method dan Silhouette Score, dapat di simpulkan::")
-        
-        # Menentukan jumlah klaster optimal dari Elbow Method
-        optimal_clusters = 2  # Ganti dengan hasil analisis Elbow Method
-        st.write(f"Jumlah klaster optimal berdasarkan Elbow Method: {optimal_clusters}")
-        
-        # Menampilkan Silhouette Score tertinggi
-        best_silhouette_score = max(silhouette_scores)
-        st.write(f"Silhouette Score tertinggi: {best_silhouette_score}")
-
-# Display the scatter plot using Plotly Express
-with st.expander("⬇ CLUSTER VISUALIZATION"):
-    fig = px.scatter(df, x='LONGITUDE', y='LATITUDE', color='Cluster',
+    lazy_panel("⬇ KESIMPULAN", conclusion, 'kmeans_conclusion')
+
+# Display the scatter plot using Plotly Express (KMeans with 2 clusters)
+def cluster_visualization():
+    clustered = df.assign(Cluster=kmeans_result(DATASET_JUMLAH, 2)['labels'])
+    fig = scatter_chart(clustered, 'LONGITUDE', 'LATITUDE', version, color='Cluster',
                  title="Clusters of Regions", labels={'LONGITUDE': 'LONGITUDE', 'LATITUDE': 'LATITUDE'},
                  color_continuous_scale='viridis', size_max=10)
     fig.update_layout(showlegend=True)
     st.plotly_chart(fig)
 
+lazy_panel("⬇ CLUSTER VISUALIZATION", cluster_visualization, 'kmeans_clusters')
@@ -1,12 +1,18 @@
 import streamlit as st
-import pandas as pd
-from sklearn.cluster import KMeans
 import folium
 from folium import plugins
 from folium.plugins import HeatMap
-from sklearn.metrics import silhouette_score
 import plotly.express as px
-from streamlit_folium import folium_static
+import streamlit.components.v1 as components
+from longsor_cluster.data import load_dataset, dataset_version, DATASET_JUMLAH
+from longsor_cluster.charts import scatter_chart
+from longsor_cluster.consensus import kabupaten_stability
+from longsor_cluster.lazy import lazy_panel
+from longsor_cluster.precompute import consensus_result, kmeans_metrics, kmeans_result, start_precompute
+from longsor_cluster.quality import SILHOUETTE_COLUMNS, describe_silhouette
+from longsor_cluster.risk import categorize_clusters
+from longsor_cluster.maps import CLUSTER_POPUP_ROWS, MarkerLayer, add_google_maps, heat_points
+from longsor_cluster.render_cache import cached_map_html, map_key
 
 # Set page configuration
 st.set_page_config(
@@ -15,95 +21,39 @@ st.set_page_config(
     initial_sidebar_state="collapsed",  # Collapse the sidebar by default
 )
 
-# Function to load data
-@st.cache_data
+# Function to load data (copy of the shared frame, clustering adds columns to it)
 def load_data(file_path):
-    data = pd.read_csv("Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv")
-    return data
-
-# Function to perform KMeans clustering and calculate Silhouette Score
-def kmeans_clustering(data, num_clusters):
-    features = data[['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']]
-    kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-    data['cluster'] = kmeans.fit_predict(features)
-    
-    # Calculate centroid for each cluster
-    centroids = data.groupby('cluster')[['JUMLAH_LONGSOR']].mean()
+    return load_dataset(file_path).copy()
 
-    # Define threshold values for density categories (adjust these based on your analysis)
-    threshold_low = 10  # Example threshold for "not dense"
-    threshold_high = 101  # Example threshold for "dense"
+# Function to perform KMeans clustering using the model fitted by the background precompute
+def kmeans_clustering(data, num_clusters, file_path):
+    data['cluster'] = kmeans_result(file_path, num_clusters)['labels']
 
-    # Add Density Category column based on centroid values
-    data['Landslide Category'] = data['cluster'].map(lambda cluster: 'Tingkat Rawan Rendah' if centroids.loc[cluster].mean() < threshold_low else ('Tingkat Rawan Sedang' if centroids.loc[cluster].mean() < threshold_high else 'Tingkat Rawan Tinggi'))
+    # Add Density Category column based on the mean JUMLAH_LONGSOR of each cluster
+    data['Landslide Category'] = categorize_clusters(data)
     
     # Elbow Method data
-    elbow_data = pd.DataFrame({'num_clusters': range(1, 11),
-                               'inertia': [KMeans(n_clusters=i, random_state=42).fit(features).inertia_ for i in range(1, 11)]})
+    elbow_data = kmeans_metrics(file_path)[['num_clusters', 'inertia']]
     
     return data, elbow_data
 
-# Function to calculate silhouette scores for a range of cluster numbers
-def calculate_silhouette_scores(data, max_clusters=10):
-    features = data[['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']]
-    silhouette_scores = []
-    for n_clusters in range(2, max_clusters + 1):
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        labels = kmeans.fit_predict(features)
-        silhouette_avg = silhouette_score(features, labels)
-        silhouette_scores.append(silhouette_avg)
-    return pd.DataFrame({'num_clusters': range(2, max_clusters + 1), 'silhouette_score': silhouette_scores})
-
-# Function to add Google Maps to Folium map
-def add_google_maps(m):
-    tiles = "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}"
-    attr = "Google Digital Satellite"
-    folium.TileLayer(tiles=tiles, attr=attr, name=attr, overlay=True, control=True).add_to(m)
-
-    # Add labels for streets and objects
-    label_tiles = "https://mt1.google.com/vt/lyrs=h&x={x}&y={y}&z={z}"
-    label_attr = "Google Labels"
-    folium.TileLayer(tiles=label_tiles, attr=label_attr, name=label_attr, overlay=True, control=True).add_to(m)
-
-    return m
+# Function to get silhouette scores for a range of cluster numbers from the precomputed fits
+def calculate_silhouette_scores(file_path, max_clusters=10):
+    metrics = kmeans_metrics(file_path, max_clusters)
+    scores = metrics[metrics['num_clusters'] >= 2]
+    return scores[['num_clusters'] + SILHOUETTE_COLUMNS].reset_index(drop=True)
 
 def create_marker_map(df_clustered):
     # Set the width and height directly when creating the Folium map
     m = folium.Map(location=[df_clustered['LATITUDE'].mean(), df_clustered['LONGITUDE'].mean()], zoom_start=10, width=1240, height=600)
 
-    # Add a marker for each data point
-    for i, row in df_clustered.iterrows():
-        # Customize popup content
-        popup_content = f"""
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-        <div style='width:400px; height:300px;'>
-            <ul class="list-group">
-                <li class="list-group-item active" aria-current="true">
-                    <h3 class="mb-0">Cluster Information</h3>
-                </li>
-                <li class="list-group-item">Cluster Number: {row['cluster']}</li>
-                <li class="list-group-item">KABUPATEN: {row['KABUPATEN']}</li>
-                <li class="list-group-item">JUMLAH_LONGSOR: {row['JUMLAH_LONGSOR']}</li>
-                <li class="list-group-item">JIWA_TERDAMPAK: {row['JIWA_TERDAMPAK']}</li>
-                <li class="list-group-item">JIWA_MENINGGAL: {row['JIWA_MENINGGAL']}</li>
-                <li class="list-group-item">RUSAK_TERDAMPAK: {row['RUSAK_TERDAMPAK']}</li>
-                <li class="list-group-item">RUSAK_RINGAN: {row['RUSAK_RINGAN']}</li>
-                <li class="list-group-item">RUSAK_SEDANG: {row['RUSAK_SEDANG']}</li>
-                <li class="list-group-item">RUSAK_BERAT: {row['RUSAK_BERAT']}</li>
-                <li class="list-group-item">TERTIMBUN: {row['TERTIMBUN']}</li>
-            </ul>
-        </div>
-        """
-
-        folium.Marker(
-            location=[row['LATITUDE'], row['LONGITUDE']],
-            tooltip=row['KABUPATEN'],
-            icon=folium.Icon(color='red', icon='home', prefix='fa'),
-        ).add_to(m).add_child(folium.Popup(popup_content, max_width=1240))
+    # Add a marker for each data point (one GeoJSON layer, popups rendered in the browser)
+    MarkerLayer(df_clustered, 'Cluster Information', CLUSTER_POPUP_ROWS,
+                icon='home', color='red', max_width=1240).add_to(m)
 
     # Heatmap Layer
-    heat_data = [[row['LATITUDE'], row['LONGITUDE']] for _, row in df_clustered.iterrows()]
-    HeatMap(heat_data).add_to(m)
+    HeatMap(heat_points(df_clustered)).add_to(m)
+
     # Drawing Tools
     draw = plugins.Draw()
     draw.add_to(m)
@@ -144,22 +94,42 @@ def display_clustering_summary(df_clustered, num_clusters):
         
         st.info(summary)
 
+# Function to show how stable the cluster and risk category of every kabupaten is across many KMeans runs
+# (the consensus runs only while the panel is open)
+def display_stability(df_clustered, num_clusters):
+    def stability_panel():
+        from sklearn.metrics import adjusted_rand_score
+
+        result = consensus_result(DATASET_JUMLAH, 'kmeans', num_clusters)
+        st.write(f"Konsensus dari {result['runs']} run KMeans pada sampel acak {result['subsample']:.0%} data. "
+                 "Stabilitas 1.00 berarti kabupaten/kota selalu berada di klaster yang sama dengan anggota klasternya; Category Stability adalah bagian run yang memberi kategori tingkat rawan yang sama.")
+        st.dataframe(kabupaten_stability(df_clustered, result), hide_index=True, use_container_width=True,
+                     column_config={"Stability": st.column_config.ProgressColumn("Stability", min_value=0.0, max_value=1.0, format="%.2f"),
+                                    "Category Stability": st.column_config.ProgressColumn("Category Stability", min_value=0.0, max_value=1.0, format="%.2f")})
+        agreement = adjusted_rand_score(df_clustered['cluster'], result['labels'])
+        st.caption(f"Kesesuaian klaster peta dengan partisi konsensus (Adjusted Rand Index): {agreement:.2f}")
+
+    lazy_panel("⬇ STABILITAS KLASTER (CONSENSUS)", stability_panel, 'kmeans_stability')
+
 # Function to handle KMeans page
 def kmeans_page():
     st.header("KMeans Clustering Page", anchor='center')
 
+    # Fit every slider position in the background (once per dataset version)
+    start_precompute(DATASET_JUMLAH)
+
 
     # Sidebar: Choose the number of clusters
     num_clusters = st.sidebar.slider("Number of Clusters", min_value=2, max_value=10, value=2)
 
     # Load data from the home page
-    data_from_homepage = load_data('Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv')  # Replace with your actual data file path
+    data_from_homepage = load_data(DATASET_JUMLAH)
 
     # Perform KMeans clustering
-    df_clustered, elbow_data = kmeans_clustering(data_from_homepage, num_clusters)
+    df_clustered, elbow_data = kmeans_clustering(data_from_homepage, num_clusters, DATASET_JUMLAH)
    
     # Calculate Silhouette Scores for a range of clusters
-    silhouette_scores_df = calculate_silhouette_scores(data_from_homepage)
+    silhouette_scores_df = calculate_silhouette_scores(DATASET_JUMLAH)
 
     # Save the clustered data in session_state
     st.session_state.df_clustered = df_clustered
@@ -195,11 +165,17 @@ def kmeans_page():
                                 )}
                             )
 
+        # Stability of every kabupaten across many seeded runs (computed on first use, cached)
+        display_stability(df_clustered, num_clusters)
+
     with tab2:
         with st.expander('Kabupaten/Kota View Analitycs Clustering', expanded=True):
-            # Use folium_static to display the Folium map
-            folium_map = create_marker_map(st.session_state.df_clustered)
-            folium_static(folium_map, width=1240, height=600)
+            # Rendered map HTML is cached per (dataset version, cluster labels)
+            map_html = cached_map_html(
+                map_key(dataset_version(DATASET_JUMLAH), labels=df_clustered['cluster']),
+                lambda: create_marker_map(st.session_state.df_clustered),
+            )
+            components.html(map_html, width=1240, height=610)
 
         with st.expander("SELECT DATA"):
             selected_city = st.selectbox("Select ", df_clustered['KABUPATEN'])
@@ -221,8 +197,9 @@ def kmeans_page():
 
         with col3:
             with st.expander("⬇ SCATTERPLOT:"):
-                scatter_plot = px.scatter(df_clustered, x='LATITUDE', y='LONGITUDE', color='cluster',
-                                          hover_data=['KABUPATEN'])
+                # Aggregated to a grid when the rows do not fit the chart payload budget
+                scatter_plot = scatter_chart(df_clustered, 'LATITUDE', 'LONGITUDE', dataset_version(DATASET_JUMLAH),
+                                             color='cluster', hover_data=['KABUPATEN'])
                 st.plotly_chart(scatter_plot, use_container_width=True)
                 
         with col4:
@@ -245,12 +222,16 @@ def kmeans_page():
         col = st.columns((5, 1.5), gap='medium')
         with col[0]:
             st.expander('Kabupaten/Kota Maps View Silhouette Score Clustering', expanded=True)
-            # Line plot for silhouette scores
+            # Line plot for silhouette scores, error bars show the confidence interval of estimated scores
             silhouette_line_plot = px.line(silhouette_scores_df, x='num_clusters', y='silhouette_score',
+                                           error_y=silhouette_scores_df['ci_high'] - silhouette_scores_df['silhouette_score'],
+                                           error_y_minus=silhouette_scores_df['silhouette_score'] - silhouette_scores_df['ci_low'],
                                            markers=True, labels={'num_clusters': 'Number of Clusters', 'silhouette_score': 'Silhouette Score'})
             st.plotly_chart(silhouette_line_plot, use_container_width=True)
         with col[1]:
-            st.write(silhouette_scores_df)
+            st.write(silhouette_scores_df[['num_clusters', 'silhouette_score', 'ci_low', 'ci_high']])
+            best = silhouette_scores_df.loc[silhouette_scores_df['silhouette_score'].idxmax()]
+            st.caption(f"Best k = {int(best['num_clusters'])}: {describe_silhouette(best)}")
 
         with st.expander('Informasi Skor Siluet', expanded=True):
             st.write('''
@@ -1,17 +1,12 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.cluster import AgglomerativeClustering
-from scipy.cluster.hierarchy import dendrogram, linkage
-from sklearn.metrics import silhouette_score
-from scipy.cluster.hierarchy import cophenet, dendrogram, linkage
-from scipy.spatial.distance import pdist
-from scipy.cluster.hierarchy import fcluster
-from streamlit_folium import folium_static
-import folium
-from folium import plugins
-from folium.plugins import HeatMap
-import plotly_express as px
+from longsor_cluster.data import load_dataset, dataset_version, DATASET_JUMLAH
+from longsor_cluster.ahc import LINKAGE_METHODS
+from longsor_cluster.dendrogram import DEFAULT_LEVEL, auto_truncation, dendrogram_png, subtree_figure, zoom_nodes
+from longsor_cluster.charts import line_chart
+from longsor_cluster.lazy import lazy_panel, memoized
+from longsor_cluster.precompute import ahc_silhouette, ahc_tree, start_precompute
+from longsor_cluster.quality import describe_silhouette
 
 # Set page configuration
 st.set_page_config(
@@ -49,30 +44,31 @@ st.markdown(
 </style>
 """, unsafe_allow_html=True)
     
-# Read data
-df = pd.read_csv("Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv")
-
-# Select features for clustering
-features_ahc = df[
-    [
-        'JUMLAH_LONGSOR',
-        'JIWA_TERDAMPAK',
-        'JIWA_MENINGGAL',
-        'RUSAK_TERDAMPAK',
-        'RUSAK_RINGAN',
-        'RUSAK_SEDANG',
-        'RUSAK_BERAT',
-        'TERTIMBUN',
-        'LATITUDE',
-        'LONGITUDE'
-    ]
-]
-
-# Agglomerative Hierarchical Clustering method
-linkage_matrix = linkage(features_ahc, method='single')
+# Function to show a dendrogram: one cached image per tree (truncated to the last merged clusters
+# for large trees), or a zoomable subtree built on demand
+def show_dendrogram(Z, title, method):
+    if st.toggle('Interaktif (zoom subtree)', key=f'dendrogram_interactive_{method}'):
+        node, _, _ = st.selectbox('Subtree', zoom_nodes(Z), key=f'dendrogram_node_{method}',
+                                  format_func=lambda node: f'Node {node[0]} ({node[1]} daun, jarak {node[2]:.2f})')
+        level = st.slider('Kedalaman (level)', 1, 10, DEFAULT_LEVEL, key=f'dendrogram_level_{method}')
+        st.plotly_chart(subtree_figure(Z, node, level, title), use_container_width=True)
+    else:
+        truncate_mode, p = auto_truncation(Z)
+        st.image(dendrogram_png(Z, title, truncate_mode, p))
+        if truncate_mode is not None:
+            st.caption(f'{len(Z) + 1} daun; ditampilkan {p} klaster terakhir (lastp).')
+
+# Read data (the shared frame, this page does not modify it)
+df = load_dataset(DATASET_JUMLAH)
+version = dataset_version(DATASET_JUMLAH)
+
+# Trees and silhouette tables come from the shared precompute (fitted on the shared preprocessing
+# pipeline features, loaded from the model store after a restart); every panel below is computed
+# only while it is open and waits for the precompute only then
+start_precompute(DATASET_JUMLAH)
 
 # Ekspander untuk menampilkan data
-with st.expander("⬇ DATA UNDERSTANDING FOR AGGLOMERATIVE HIERARCHICAL CLUSTERING :"):
+def data_understanding():
     # Display summary statistics
     st.write("Summary statistic adalah ringkasan statistik deskriptif yang mencakup ukuran-ukuran seperti mean, median, mode, range, varians, standar deviasi, serta quartiles, yang memberikan gambaran singkat mengenai distribusi dan tendensi data dalam sebuah dataset.")
 
@@ -80,52 +76,42 @@ with st.expander("⬇ DATA UNDERSTANDING FOR AGGLOMERATIVE HIERARCHICAL CLUSTERI
 
    
     st.write("### Summary Statistics:")
-    st.write(df.describe())
+    st.write(memoized((version, 'describe'), df.describe))
+
+lazy_panel("⬇ DATA UNDERSTANDING FOR AGGLOMERATIVE HIERARCHICAL CLUSTERING :", data_understanding, 'ahc_data_understanding')
 
 # Choose the column for the line chart
 selected_column = 'JUMLAH_LONGSOR'
 
-# Calculate quartiles
-quartiles = df[selected_column].quantile([0.25, 0.5, 0.75])
+# Function to show one quartile of the column with its line chart
+def quartile_panel(quantile, label, title):
+    # Calculate quartiles
+    quartiles = memoized((version, 'quartiles', selected_column), lambda: df[selected_column].quantile([0.25, 0.5, 0.75]))
+
+    # Display quartile values
+    st.write(f"**Quartile Information for {selected_column}:**")
+    st.write(f"- {label}: {quartiles[quantile]}")
+
+    # Line chart for the percentile (downsampled when the data does not fit the chart payload budget)
+    fig = memoized((version, 'quartile_line', selected_column, title), lambda: line_chart(df, selected_column, version, title=title, height=300, width=400))
+    st.plotly_chart(fig)
 
 # Create columns for expanders
 c1, c2, c3 = st.columns(3)
 
 with c1:
-    with st.expander("⬇ QUARTILE Q1"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 0.25% Percentile (Q1): {quartiles[0.25]}")
-
-        # Line chart for the 25th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 25th Percentile (Q1)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q1", lambda: quartile_panel(0.25, "0.25% Percentile (Q1)", "Line Chart - 25th Percentile (Q1)"), 'ahc_q1')
 
 with c2:
-    with st.expander("⬇ QUARTILE Q2"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 50th Percentile (Q2): {quartiles[0.5]}")
-
-        # Line chart for the 50th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 50th Percentile (Q2)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q2", lambda: quartile_panel(0.5, "50th Percentile (Q2)", "Line Chart - 50th Percentile (Q2)"), 'ahc_q2')
 
 with c3:
-    with st.expander("⬇ QUARTILE Q3"):
-        # Display quartile values
-        st.write(f"**Quartile Information for {selected_column}:**")
-        st.write(f"- 75th Percentile (Q3): {quartiles[0.75]}")
-
-        # Line chart for the 75th percentile
-        fig = px.line(df, x=df.index, y=selected_column, title="Line Chart - 75th Percentile (Q3)")
-        fig.update_layout(height=300, width=400)  # Adjust the size
-        st.plotly_chart(fig)
+    lazy_panel("⬇ QUARTILE Q3", lambda: quartile_panel(0.75, "75th Percentile (Q3)", "Line Chart - 75th Percentile (Q3)"), 'ahc_q3')
 
 # Exploring variables
-with st.expander("⬇ EKSPLORASI VARIABEL:"):
+def variable_exploration():
+    import plotly_express as px
+
     st.subheader("Korelasi antara Variabel")
     selected_features = [
         'JUMLAH_LONGSOR',
@@ -139,7 +125,7 @@ with st.expander("⬇ EKSPLORASI VARIABEL:"):
     ]
 
     # Calculate correlation matrix
-    correlation_matrix = df[selected_features].corr()
+    correlation_matrix = memoized((version, 'correlation', tuple(selected_features)), lambda: df[selected_features].corr())
 
     # Plot heatmap using Plotly Express
     fig = px.imshow(correlation_matrix,
@@ -153,14 +139,18 @@ with st.expander("⬇ EKSPLORASI VARIABEL:"):
 
     st.write("Visualisasi ini memberikan representasi visual dari data dalam bentuk matriks, di mana intensitas warna pada setiap sel matriks menggambarkan nilai variabel yang bersangkutan, memudahkan identifikasi pola, keterkaitan, atau perbedaan dalam data.")
 
+lazy_panel("⬇ EKSPLORASI VARIABEL:", variable_exploration, 'ahc_variables')
+
 # checking null value
-with st.expander("⬇ NULL VALUES, TENDENCY & VARIABLE DISPERSION"):
+def null_values():
     a1, a2 = st.columns(2)
     a1.write("Jumlah nilai yang tidak ada (NaN atau None) dalam setiap kolom DataFrame.")
-    a1.dataframe(df.isnull().sum(), use_container_width=True)
+    a1.dataframe(memoized((version, 'null_counts'), lambda: df.isnull().sum()), use_container_width=True)
 
     a2.write("Informasi tentang tendensi pusat, dispersi, dan distribusi data.")
-    a2.dataframe(df.describe().T, use_container_width=True)
+    a2.dataframe(memoized((version, 'describe'), df.describe).T, use_container_width=True)
+
+lazy_panel("⬇ NULL VALUES, TENDENCY & VARIABLE DISPERSION", null_values, 'ahc_null_values')
 
 
 st.header("METODE LINKAGE")
@@ -170,182 +160,111 @@ with st.expander("⬇ LINKAGE INFORMATION"):
     st.write("Complete Linkage: Menggunakan jarak maksimum antara anggota klaster.")
     st.write("Average Linkage: Menggunakan rata-rata jarak antara semua pasangan anggota klaster.")
 
-# Convert 'KABUPATEN' column to numeric
-df['KABUPATEN'] = pd.factorize(df['KABUPATEN'])[0]
+# One linkage tree per method, shared by CCC, dendrograms and silhouette.
+# For large data the leaves are BIRCH micro-clusters.
+def dendrogram_panel(method, name):
+    tree = ahc_tree(DATASET_JUMLAH, method)
 
-# Select numerical columns for clustering
-numeric_columns = ['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']
-X_ahc = df[numeric_columns]
+    # Visualisasi Dendrogram
+    show_dendrogram(tree['linkage'], f'Dendrogram AHC ({name})', method)
 
-# Handle NaN values by filling with column means
-X_ahc.fillna(X_ahc.mean(), inplace=True)
-
-# Perform Agglomerative Hierarchical Clustering (AHC)
-ahc = AgglomerativeClustering(n_clusters=None, distance_threshold=0)
-df['Cluster_AHC'] = ahc.fit_predict(X_ahc)
-
-# Calculate CCC for single linkage
-linkage_matrix_single = linkage(X_ahc, method='single')
-cophenet_matrix_single, _ = cophenet(linkage_matrix_single, pdist(X_ahc))
-ccc_single = cophenet_matrix_single.mean()
-
-# Calculate CCC for Complete linkage
-linkage_matrix_complete = linkage(X_ahc, method='complete')
-cophenet_matrix_complete, _ = cophenet(linkage_matrix_complete, pdist(X_ahc))
-ccc_complete = cophenet_matrix_complete.mean()
-
-# Calculate CCC for Average linkage
-linkage_matrix_average = linkage(X_ahc, method='average')
-cophenet_matrix_average, _ = cophenet(linkage_matrix_average, pdist(X_ahc))
-ccc_average = cophenet_matrix_average.mean()
-
-# Definisikan tinggi pemotongan untuk setiap metode linkage
-cut_height_single = 25  # Sesuaikan dengan visualisasi dendrogram single
-cut_height_complete = 10.0  # Sesuaikan dengan visualisasi dendrogram Complete
-cut_height_average = 5.0
-
-# Menggunakan fcluster untuk mendapatkan label klaster
-labels_single = fcluster(linkage_matrix_single, t=cut_height_single, criterion='distance')
-labels_complete = fcluster(linkage_matrix_complete, t=cut_height_complete, criterion='distance')
-labels_average = fcluster(linkage_matrix_average, t=cut_height_average, criterion='distance')
+    st.write(f"Cophenetic Correlation Coefficient (CCC) untuk Dendrogram AHC ({name}): {tree['ccc']:.4f}")
 
 # Menampilkan kesimpulan
 c1, c2, c3 = st.columns(3)
 
 with c1:
-    with st.expander("⬇ DENDROGRAM SINGLE"):
-        # Visualisasi Dendrogram untuk single
-        plt.figure(figsize=(8, 6))
-        dendrogram(linkage_matrix_single)
-        plt.title('Dendrogram AHC (Single)')
-        plt.xlabel('Indeks Data')
-        plt.ylabel('Jarak')
-        st.pyplot()
-
-        st.write(f"Cophenetic Correlation Coefficient (CCC) untuk Dendrogram AHC (single): {ccc_single:.4f}")
-        
+    lazy_panel("⬇ DENDROGRAM SINGLE", lambda: dendrogram_panel('single', 'Single'), 'ahc_dendrogram_single')
+
 with c2:
-    with st.expander("⬇ DENDROGRAM COMPLETE"):
-        # Visualisasi Dendrogram untuk Complete
-        plt.figure(figsize=(8, 6))
-        dendrogram(linkage_matrix_complete)
-        plt.title('Dendrogram AHC (Complete)')
-        plt.xlabel('Indeks Data')
-        plt.ylabel('Jarak')
-        st.pyplot()
-
-        st.write(f"Cophenetic Correlation Coefficient (CCC) untuk Dendrogram AHC (Complete): {ccc_complete:.4f}")
-        
+    lazy_panel("⬇ DENDROGRAM COMPLETE", lambda: dendrogram_panel('complete', 'Complete'), 'ahc_dendrogram_complete')
+
 with c3:
-    with st.expander("⬇ DENDROGRAM AVERAGE"):
-        # Visualisasi Dendrogram untuk Average
-        plt.figure(figsize=(8, 6))
-        dendrogram(linkage_matrix_average)
-        plt.title('Dendrogram AHC (Average)')
-        plt.xlabel('Indeks Data')
-        plt.ylabel('Jarak')
-        st.pyplot()
-
-        st.write(f"Cophenetic Correlation Coefficient (CCC) untuk Dendrogram AHC (Average): {ccc_average:.4f}")
-      
+    lazy_panel("⬇ DENDROGRAM AVERAGE", lambda: dendrogram_panel('average', 'Average'), 'ahc_dendrogram_average')
    
 
-# Assuming X_ahc is already defined
-# Your clustering and silhouette score calculation code
-silhouette_scores_single = []
-silhouette_scores_complete = []
-silhouette_scores_average = []
-
+# Silhouette score for every k, cutting the shared tree of each linkage method
 n_clusters_range = range(2, 11)
 
-for n_clusters in n_clusters_range:
-    # Metode 'single'
-    clusterer_single = AgglomerativeClustering(n_clusters=n_clusters, linkage='single')
-    cluster_labels_single = clusterer_single.fit_predict(X_ahc)
-    silhouette_avg_single = silhouette_score(X_ahc, cluster_labels_single)
-    silhouette_scores_single.append(silhouette_avg_single)
-    
-    
-    # Metode 'complete'
-    clusterer_complete = AgglomerativeClustering(n_clusters=n_clusters, linkage='complete')
-    cluster_labels_complete = clusterer_complete.fit_predict(X_ahc)
-    silhouette_avg_complete = silhouette_score(X_ahc, cluster_labels_complete)
-    silhouette_scores_complete.append(silhouette_avg_complete)
-
-     # Metode 'average'
-    clusterer_average = AgglomerativeClustering(n_clusters=n_clusters, linkage='average')
-    cluster_labels_average = clusterer_average.fit_predict(X_ahc)
-    silhouette_avg_average = silhouette_score(X_ahc, cluster_labels_average)
-    silhouette_scores_average.append(silhouette_avg_average)
-
-# Create dataframes for silhouette scores
-silhouette_scores_single_df = pd.DataFrame({'Number of Clusters': n_clusters_range, 'Silhouette Score': silhouette_scores_single})
-silhouette_scores_complete_df = pd.DataFrame({'Number of Clusters': n_clusters_range, 'Silhouette Score': silhouette_scores_complete})
-silhouette_scores_average_df = pd.DataFrame({'Number of Clusters': n_clusters_range, 'Silhouette Score': silhouette_scores_average})
+# Create dataframes for silhouette scores (with the confidence interval of estimated scores)
+def silhouette_table(scores):
+    return pd.DataFrame({'Number of Clusters': n_clusters_range, 'Silhouette Score': scores['silhouette_score'].tolist(),
+                         'CI Low': scores['ci_low'].tolist(), 'CI High': scores['ci_high'].tolist()})
+
+# Function to show the silhouette table of one linkage method with its best k
+def silhouette_panel(method, name):
+    scores = ahc_silhouette(DATASET_JUMLAH, method)
+    st.write(f"Silhouette Scores for {name} Linkage:")
+    st.table(silhouette_table(scores))
+    best = scores.sort_values('silhouette_score').iloc[-1]
+    st.caption(f"Best k = {int(best['num_clusters'])}: {describe_silhouette(best)}")
 
 # Display the line charts and optimal cluster information using Plotly Express
 c1, c2, c3 = st.columns(3)
 
 with c1:
-    with st.expander("⬇ SILLHOUTE SCORE SINGLE"):
-        st.write("Silhouette Scores for Single Linkage:")
-        st.table(silhouette_scores_single_df)
+    lazy_panel("⬇ SILLHOUTE SCORE SINGLE", lambda: silhouette_panel('single', 'Single'), 'ahc_silhouette_single')
 
 with c2:
-     with st.expander("⬇ SILLHOUTE SCORE COMPLETE"):
-        st.write("Silhouette Scores for Complete Linkage:")
-        st.table(silhouette_scores_complete_df)
+    lazy_panel("⬇ SILLHOUTE SCORE COMPLETE", lambda: silhouette_panel('complete', 'Complete'), 'ahc_silhouette_complete')
 
 with c3:
-    with st.expander("⬇ SILLHOUTE SCORE AVERAGE"):
-        st.write("Silhouette Scores for Average Linkage:")
-        st.table(silhouette_scores_average_df)
+    lazy_panel("⬇ SILLHOUTE SCORE AVERAGE", lambda: silhouette_panel('average', 'Average'), 'ahc_silhouette_average')
+
+# Membuat plot perbandingan CCC
+def ccc_comparison():
+    import plotly_express as px
+
+    # Membuat DataFrame untuk perbandingan CCC
+    ccc_comparison_df = pd.DataFrame({
+        'Metode': ['Single', 'Complete', 'Average'],
+        'CCC': [ahc_tree(DATASET_JUMLAH, method)['ccc'] for method in ['single', 'complete', 'average']]
+    })
+
+    fig_ccc = px.bar(ccc_comparison_df, x='Metode', y='CCC', 
+                    title='Perbandingan Cophenetic Correlation Coefficient (CCC)',
+                    labels={'CCC': 'Cophenetic Correlation Coefficient', 'Metode': 'Metode Clustering'},
+                    color='Metode',
+                    color_discrete_map={
+                        'Single': 'green',
+                        'Complete': 'red',
+                        'Average': 'blue'
+                        
+                    })
 
-# Membuat DataFrame untuk perbandingan CCC
-ccc_comparison = {
-    'Metode': ['Single', 'Complete', 'Average'],
-    'CCC': [ccc_single, ccc_complete, ccc_average ]
-}
-ccc_comparison_df = pd.DataFrame(ccc_comparison)
+    # Menampilkan plot
+    st.plotly_chart(fig_ccc)
 
 # Menampilkan plot Silhouette Score terhadap jumlah cluster untuk masing-masing metode
-silhouette_df = pd.DataFrame({
-    'Jumlah Cluster': list(n_clusters_range),
-    'Single Linkage': silhouette_scores_single,
-    'Complete Linkage': silhouette_scores_complete,
-    'Average Linkage': silhouette_scores_average
-   
-})
+def silhouette_comparison():
+    import plotly_express as px
+
+    silhouette_sweep = pd.concat([ahc_silhouette(DATASET_JUMLAH, method).assign(method=method) for method in LINKAGE_METHODS])
+    silhouette_by_method = silhouette_sweep.pivot(index='num_clusters', columns='method', values='silhouette_score')
+    silhouette_df = pd.DataFrame({
+        'Jumlah Cluster': list(n_clusters_range),
+        'Single Linkage': silhouette_by_method['single'].tolist(),
+        'Complete Linkage': silhouette_by_method['complete'].tolist(),
+        'Average Linkage': silhouette_by_method['average'].tolist()
+       
+    })
+
+    fig = px.line(silhouette_df, x='Jumlah Cluster', y=['Single Linkage', 'Complete Linkage', 'Average Linkage'],
+                labels={'value': 'Silhouette Score', 'variable': 'Metode'},
+                title='Silhouette Score untuk Berbagai Jumlah Cluster',
+                color_discrete_map={
+                    'Single Linkage': 'green',
+                    'Complete Linkage': 'red',
+                    'Average Linkage': 'blue'
+                    
+                })
+
+    # Tampilkan plot
+    st.plotly_chart(fig)
 
 c1,c2 = st.columns(2)
 with c1:
-    with st.expander("⬇ PERBANDINGAN METODE SINGLE, COMPLETE DAN AVERAGE DENGAN COPHENETIC CORRELATION COEFFICIENT"):
-        # Membuat plot perbandingan CCC
-        fig_ccc = px.bar(ccc_comparison_df, x='Metode', y='CCC', 
-                        title='Perbandingan Cophenetic Correlation Coefficient (CCC)',
-                        labels={'CCC': 'Cophenetic Correlation Coefficient', 'Metode': 'Metode Clustering'},
-                        color='Metode',
-                        color_discrete_map={
-                            'Single': 'green',
-                            'Complete': 'red',
-                            'Average': 'blue'
-                            
-                        })
-
-        # Menampilkan plot
-        st.plotly_chart(fig_ccc)
+    lazy_panel("⬇ PERBANDINGAN METODE SINGLE, COMPLETE DAN AVERAGE DENGAN COPHENETIC CORRELATION COEFFICIENT", ccc_comparison, 'ahc_ccc_comparison')
 
 with c2:
-    with st.expander("⬇ PERBANDINGAN METODE SINGLE, COMPLETE DAN AVERAGE DENGAN SILLHOUTE SCORE"):
-        fig = px.line(silhouette_df, x='Jumlah Cluster', y=['Single Linkage', 'Complete Linkage', 'Average Linkage'],
-                    labels={'value': 'Silhouette Score', 'variable': 'Metode'},
-                    title='Silhouette Score untuk Berbagai Jumlah Cluster',
-                    color_discrete_map={
-                        'Single Linkage': 'green',
-                        'Complete Linkage': 'red',
-                        'Average Linkage': 'blue'
-                        
-                    })
-
-        # Tampilkan plot
-        st.plotly_chart(fig)
+    lazy_panel("⬇ PERBANDINGAN METODE SINGLE, COMPLETE DAN AVERAGE DENGAN SILLHOUTE SCORE", silhouette_comparison, 'ahc_silhouette_comparison')
@@ -1,15 +1,19 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.cluster import AgglomerativeClustering
-from scipy.cluster.hierarchy import cophenet, dendrogram, linkage
-from sklearn.metrics import silhouette_score
 import folium
-from streamlit_folium import folium_static
 from folium.plugins import HeatMap
 import plotly.express as px
 from folium import plugins
-from sklearn.preprocessing import StandardScaler
+from longsor_cluster.data import load_dataset, dataset_version, DATASET_JUMLAH
+from longsor_cluster.preprocess import transformed_features
+from longsor_cluster.ahc import cluster_tree, cut_k
+from longsor_cluster.charts import scatter_chart
+from longsor_cluster.consensus import kabupaten_stability
+from longsor_cluster.lazy import lazy_panel
+from longsor_cluster.precompute import ahc_labels, ahc_silhouette, consensus_result, start_precompute
+from longsor_cluster.quality import describe_silhouette
+from longsor_cluster.risk import categorize_rows
+from longsor_cluster.maps import CLUSTER_POPUP_ROWS, MarkerLayer, add_google_maps, apply_clicked_kabupaten, heat_points, selection_layer, show_interactive_map, sync_clicked_kabupaten
+from longsor_cluster.render_cache import cached_map, map_key
 
 
 # Set Streamlit options
@@ -22,96 +26,38 @@ st.set_page_config(page_title="Dashboard", page_icon="📈", layout="wide")
 with open('style.css') as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-# Read the dataset
-data = pd.read_csv('Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv')  # Change path to your new dataset
-
 # Function to perform Agglomerative Hierarchical Clustering based on selected features and linkage
 def ahc_clustering(data, n_clusters, selected_features, linkage_method):
-    features = data[selected_features + ['LATITUDE', 'LONGITUDE']]
-    clusterer = AgglomerativeClustering(n_clusters=n_clusters, linkage=linkage_method)
-    data['cluster'] = clusterer.fit_predict(features)
-
-    # Calculate centroid for each cluster
-    centroids = data.groupby('cluster')[['JUMLAH_LONGSOR']].mean()
-
-    # Define threshold values for density categories (adjust these based on your analysis)
-    threshold_low = 10  # Example threshold for "not dense"
-    threshold_high = 101  # Example threshold for "dense"
+    if selected_features:
+        features = transformed_features(DATASET_JUMLAH, selected_features + ['LATITUDE', 'LONGITUDE'])
+        Z, leaves = cluster_tree(features, linkage_method)
+        data['cluster'] = cut_k(Z, n_clusters)[leaves]
+    else:
+        # Location-only clustering is precomputed in the background for every k and linkage
+        data['cluster'] = ahc_labels(DATASET_JUMLAH, linkage_method, n_clusters)
 
-    # Add Landslide Category column based on quartile values
-    data['Landslide Category'] = data.apply(lambda row: 'Tingkat Rawan Rendah' if row['JUMLAH_LONGSOR'] < threshold_low else ('Tingkat Rawan Sedang' if row['JUMLAH_LONGSOR'] < threshold_high else 'Tingkat Rawan Tinggi'), axis=1)
+    # Add Landslide Category column based on the JUMLAH_LONGSOR of each row
+    data['Landslide Category'] = categorize_rows(data)
     
     return data
 
 
 # Function to calculate silhouette scores for a range of cluster numbers
-def calculate_silhouette_scores(data, max_clusters=10, linkage_method='ward'):
-    selected_features = ['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']
-    silhouette_scores = []
-    for n_clusters in range(2, max_clusters + 1):
-        features = data[selected_features]
-        clusterer = AgglomerativeClustering(n_clusters=n_clusters, linkage=linkage_method)
-        labels = clusterer.fit_predict(features)
-        silhouette_avg = silhouette_score(features, labels)
-        silhouette_scores.append(silhouette_avg)
-    return pd.DataFrame({'num_clusters': range(2, max_clusters + 1), 'silhouette_score': silhouette_scores})
-
-# Function to add Google Maps to Folium map
-def add_google_maps(m):
-    tiles = "https://mt1.google.com/vt/lyrs=s&x={x}&y={y}&z={z}"
-    attr = "Google Digital Satellite"
-    folium.TileLayer(tiles=tiles, attr=attr, name=attr, overlay=True, control=True).add_to(m)
-
-    # Add labels for streets and objects
-    label_tiles = "https://mt1.google.com/vt/lyrs=h&x={x}&y={y}&z={z}"
-    label_attr = "Google Labels"
-    folium.TileLayer(tiles=label_tiles, attr=label_attr, name=label_attr, overlay=True, control=True).add_to(m)
-
-    return m
+def calculate_silhouette_scores(file_path, max_clusters=10, linkage_method='ward'):
+    scores = ahc_silhouette(file_path, linkage_method)
+    return scores[scores['num_clusters'] <= max_clusters]
 
 # Function to create Folium map with clustered markers
-def create_marker_map(df_clustered, selected_kabupaten, scaled_data):
+def create_marker_map(df_clustered, selected_kabupaten):
     # Set the width and height directly when creating the Folium map
     m = folium.Map(location=[df_clustered['LATITUDE'].mean(), df_clustered['LONGITUDE'].mean()], zoom_start=8, width=1240, height=600)
 
-    # Add a marker for each data point
-    for i, row in df_clustered.iterrows():
-        # Customize popup content
-        popup_content = f"""
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-        <div style='width:400px; height:300px;'>
-            <ul class="list-group">
-                <li class="list-group-item active" aria-current="true">
-                    <h3 class="mb-0">Cluster Information</h3>
-                </li>
-                <li class="list-group-item">Cluster Number: {row['cluster']}</li>
-                <li class="list-group-item">KABUPATEN: {row['KABUPATEN']}</li>
-                <li class="list-group-item">JUMLAH_LONGSOR: {row['JUMLAH_LONGSOR']}</li>
-                <li class="list-group-item">JIWA_TERDAMPAK: {row['JIWA_TERDAMPAK']}</li>
-                <li class="list-group-item">JIWA_MENINGGAL: {row['JIWA_MENINGGAL']}</li>
-                <li class="list-group-item">RUSAK_TERDAMPAK: {row['RUSAK_TERDAMPAK']}</li>
-                <li class="list-group-item">RUSAK_RINGAN: {row['RUSAK_RINGAN']}</li>
-                <li class="list-group-item">RUSAK_SEDANG: {row['RUSAK_SEDANG']}</li>
-                <li class="list-group-item">RUSAK_BERAT: {row['RUSAK_BERAT']}</li>
-                <li class="list-group-item">TERTIMBUN: {row['TERTIMBUN']}</li>
-            </ul>
-        </div>
-        """
-
-        if row['KABUPATEN'] == selected_kabupaten:
-            icon = folium.Icon(color='red', icon='exclamation-triangle', prefix='fa')
-        else:
-            icon = folium.Icon(color='orange', icon='exclamation-triangle', prefix='fa')
-        
-        folium.Marker(
-            location=[row['LATITUDE'], row['LONGITUDE']],
-            tooltip=row['KABUPATEN'],
-            icon=icon,  # Use the defined icon variable
-        ).add_to(m).add_child(folium.Popup(popup_content, max_width=1240))
+    # Add a marker for each data point (one GeoJSON layer, popups rendered in the browser)
+    MarkerLayer(df_clustered, 'Cluster Information', CLUSTER_POPUP_ROWS,
+                selected_kabupaten=selected_kabupaten, max_width=1240).add_to(m)
 
     # Heatmap Layer
-    heat_data = [[row['LATITUDE'], row['LONGITUDE']] for _, row in df_clustered.iterrows()]
-    HeatMap(heat_data).add_to(m)
+    HeatMap(heat_points(df_clustered)).add_to(m)
 
     # Drawing Tools
     draw = plugins.Draw()
@@ -123,25 +69,45 @@ def create_marker_map(df_clustered, selected_kabupaten, scaled_data):
     return m
 
 
+# Function to show how stable the cluster of every kabupaten is across many AHC runs
+# (the consensus runs only while the panel is open)
+def display_stability(df_clustered, num_clusters, linkage_method):
+    def stability_panel():
+        from sklearn.metrics import adjusted_rand_score
+
+        result = consensus_result(DATASET_JUMLAH, 'ahc', num_clusters, linkage_method)
+        st.write(f"Konsensus dari {result['runs']} run AHC pada sampel acak {result['subsample']:.0%} data. "
+                 "Stabilitas 1.00 berarti kabupaten/kota selalu berada di klaster yang sama dengan anggota klasternya.")
+        st.dataframe(kabupaten_stability(df_clustered, result), hide_index=True, use_container_width=True,
+                     column_config={"Stability": st.column_config.ProgressColumn("Stability", min_value=0.0, max_value=1.0, format="%.2f")})
+        agreement = adjusted_rand_score(df_clustered['cluster'], result['labels'])
+        st.caption(f"Kesesuaian klaster peta dengan partisi konsensus (Adjusted Rand Index): {agreement:.2f}")
+
+    lazy_panel("⬇ STABILITAS KLASTER (CONSENSUS)", stability_panel, 'ahc_stability')
+
 # Function to handle Agglomerative Hierarchical Clustering page
 def ahc_page():
     center = True
     st.header("Agglomerative Hierarchical Clustering Page", anchor='center' if center else 'left')
 
+    # Cluster every slider/linkage combination in the background (once per dataset version)
+    start_precompute(DATASET_JUMLAH)
+
     # Sidebar: Choose the number of clusters
     num_clusters = st.sidebar.slider("Number of Clusters", min_value=2, max_value=10, value=3)
 
     # Sidebar: Choose the linkage method
     linkage_method = st.sidebar.selectbox('Select Linkage Method', ['single', 'average', 'complete'])
 
-    # Read the dataset
-    data = pd.read_csv('Jumlah-2021 - 2023 -Lengkap-Dataset_Longsor - PROV JABAR.csv')  # Change path to your new dataset
+    # Read the dataset (copy, because clustering adds columns to it)
+    data = load_dataset(DATASET_JUMLAH).copy()
 
-    # Dropdown for selecting the KABUPATEN
-    selected_kabupaten = st.sidebar.selectbox('Select Kabupaten', data['KABUPATEN'].unique())
+    # Dropdown for selecting the KABUPATEN (a marker clicked on the map also selects it)
+    apply_clicked_kabupaten('selected_kabupaten_ahc')
+    selected_kabupaten = st.sidebar.selectbox('Select Kabupaten', data['KABUPATEN'].unique(), key='selected_kabupaten_ahc')
 
     # Calculate Silhouette Scores for a range of clusters
-    silhouette_scores_df = calculate_silhouette_scores(data, max_clusters=10, linkage_method=linkage_method)
+    silhouette_scores_df = calculate_silhouette_scores(DATASET_JUMLAH, max_clusters=10, linkage_method=linkage_method)
     
     # Perform Agglomerative Hierarchical Clustering based on selected features and linkage method
     if len(data) >= 2:
@@ -151,12 +117,7 @@ def ahc_page():
         st.warning("Not enough data points for clustering. Please select different criteria.")
         return
 
-    # Standardize the features
-    scaler = StandardScaler()
-    scaled_features = scaler.fit_transform(data[['JUMLAH_LONGSOR', 'JIWA_TERDAMPAK', 'JIWA_MENINGGAL', 'RUSAK_TERDAMPAK', 'RUSAK_RINGAN', 'RUSAK_SEDANG', 'RUSAK_BERAT', 'TERTIMBUN', 'LATITUDE', 'LONGITUDE']])
-    
-    # Save the scaled features in session_state
-    st.session_state.scaled_features = scaled_features
+    # Save the clustering in session_state
     st.session_state.df_clustered = df_clustered
     st.session_state.selected_kabupaten = selected_kabupaten
 
@@ -165,9 +126,8 @@ def ahc_page():
     tab1, tab2, tab3 = st.tabs(["DATASET", "VISUALISASI MAP", "SILHOUETTE SCORE"])
 
     with tab1:
-        # Display metrics for each cluster
-        # Display metrics for each cluster
-        for cluster_num in range(num_clusters):
+        # Display metrics for each cluster (a cut can yield fewer clusters when merge heights tie)
+        for cluster_num in sorted(df_clustered['cluster'].unique()):
             landslide_category = df_clustered.loc[df_clustered['cluster'] == cluster_num, 'Landslide Category'].iloc[0]
             
             # Add a new column for index
@@ -192,13 +152,20 @@ def ahc_page():
                                 )}
                             )
 
-
+        # Stability of every kabupaten across many subsampled runs (computed on first use, cached)
+        display_stability(df_clustered, num_clusters, linkage_method)
 
     with tab2:
         with st.expander('Kabupaten/Kota Maps View Analitycs Clustering', expanded=True):
-            # Use folium_static to display the Folium map
-            folium_map = create_marker_map(st.session_state.df_clustered, st.session_state.selected_kabupaten, st.session_state.scaled_features)
-            folium_static(folium_map, width=1240, height=600)
+            # Base map is cached per (dataset version, cluster labels); the selected kabupaten
+            # is applied as a selection layer without reloading the map
+            base_map = cached_map(
+                map_key(dataset_version(DATASET_JUMLAH), labels=df_clustered['cluster']),
+                lambda: create_marker_map(st.session_state.df_clustered, None),
+            )
+            clicked_kabupaten = show_interactive_map(base_map, selection_layer(df_clustered, selected_kabupaten),
+                                                     key='ahc_map', width=1240, height=600)
+            sync_clicked_kabupaten(clicked_kabupaten, selected_kabupaten, 'selected_kabupaten_ahc')
             
         with st.expander("SELECT DATA"):
             selected_city = st.selectbox("Select ", df_clustered['KABUPATEN'])
@@ -223,7 +190,9 @@ def ahc_page():
              with st.container(border=True):
                 st.write("Scatter Plot:")
                 # Assuming 'LATITUDE' and 'LONGITUDE' are the columns you want to use for the scatter plot
-                scatter_fig = px.scatter(st.session_state.df_clustered, x='LATITUDE', y='LONGITUDE', color='cluster', title='Scatter Plot')
+                # (aggregated to a grid when the rows do not fit the chart payload budget)
+                scatter_fig = scatter_chart(st.session_state.df_clustered, 'LATITUDE', 'LONGITUDE', dataset_version(DATASET_JUMLAH),
+                                            color='cluster', title='Scatter Plot')
                 st.plotly_chart(scatter_fig, use_container_width=True)
 
         with st.expander('Informasi', expanded=True):
@@ -242,12 +211,16 @@ def ahc_page():
         col = st.columns((5, 1.5), gap='medium')
         with col[0]:
             st.expander('Kabupaten/Kota Maps View Silhouette Score Clustering', expanded=True)
-            # Line plot for silhouette scores
+            # Line plot for silhouette scores, error bars show the confidence interval of estimated scores
             silhouette_line_plot = px.line(silhouette_scores_df, x='num_clusters', y='silhouette_score',
+                                           error_y=silhouette_scores_df['ci_high'] - silhouette_scores_df['silhouette_score'],
+                                           error_y_minus=silhouette_scores_df['silhouette_score'] - silhouette_scores_df['ci_low'],
                                            markers=True, labels={'num_clusters': 'Number of Clusters', 'silhouette_score': 'Silhouette Score'})
             st.plotly_chart(silhouette_line_plot, use_container_width=True)
         with col[1]:
-            st.write(silhouette_scores_df)
+            st.write(silhouette_scores_df[['num_clusters', 'silhouette_score', 'ci_low', 'ci_high']])
+            best = silhouette_scores_df.loc[silhouette_scores_df['silhouette_score'].idxmax()]
+            st.caption(f"Best k = {int(best['num_clusters'])}: {describe_silhouette(best)}")
 
         with st.expander('Informasi', expanded=True):
             st.info('''